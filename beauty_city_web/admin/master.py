@@ -2,9 +2,16 @@ from django.contrib import admin
 
 
 class MasterAdmin(admin.ModelAdmin):
-    list_display = ("name", "specialty", "experience", "rating", "is_active")
+    list_display = (
+        "name",
+        "specialty",
+        "experience",
+        "avg_rating",
+        "review_count",
+        "is_active",
+    )
     list_filter = ("is_active", "specialty")
     search_fields = ("name", "specialty")
-    list_editable = ("is_active", "rating")
+    list_editable = ("is_active",)
     filter_horizontal = ("salons", "services")
     ordering = ("order",)
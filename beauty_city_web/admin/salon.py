@@ -1,8 +1,22 @@
 from django.contrib import admin
 from ..forms.salon import SalonForm
+from ..models import SalonWorkingHours, SalonClosure
+
+
+class SalonWorkingHoursInline(admin.TabularInline):
+    model = SalonWorkingHours
+    extra = 0
+    max_num = 7
+
+
+class SalonClosureInline(admin.TabularInline):
+    model = SalonClosure
+    extra = 0
+
 
 class SalonAdmin(admin.ModelAdmin):
     form = SalonForm
+    inlines = (SalonWorkingHoursInline, SalonClosureInline)
     
     list_display = ("name", "address", "phone", "is_active")
     list_filter = ("is_active",)
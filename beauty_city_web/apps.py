@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class BeautyCityWebConfig(AppConfig):
     name = "beauty_city_web"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -7,6 +7,12 @@ from ..utils.validators import (
     validate_working_hours,
     validate_appointment_datetime,
 )
+from ..utils.availability import (
+    all_working_mask,
+    is_slot_free,
+    iter_slots,
+    slot_time,
+)
 
 
 class BaseAppointmentForm(forms.ModelForm):
@@ -33,9 +39,40 @@ class BaseAppointmentForm(forms.ModelForm):
         return appointment_date
 
     def clean_appointment_time(self):
-        """Валидация времени"""
+        """Валидация времени по часам работы выбранного салона"""
         time_value = self.cleaned_data.get("appointment_time")
-        return validate_working_hours(time_value)
+        return self._validate_working_hours(time_value)
+
+    def _validate_working_hours(self, time_value):
+        salon = self.cleaned_data.get("salon")
+        date_value = self.cleaned_data.get("appointment_date")
+        if not self._slot_changed(salon, date_value, time_value):
+            # Запись уже стоит в расписании, его изменение не мешает
+            # отменить ее или сменить статус
+            return self.instance.appointment_time
+        service = self.cleaned_data.get("service")
+        return validate_working_hours(
+            time_value,
+            salon_id=salon.pk if salon else None,
+            date_value=date_value,
+            duration=service.duration if service else None,
+        )
+
+    def _slot_changed(self, salon, date_value, time_value):
+        """Новая запись или перенос в другой салон, день или время"""
+        instance = self.instance
+        if instance is None or instance.pk is None:
+            return True
+        if isinstance(time_value, str):
+            time_value = time_value[:5]
+            current_time = instance.appointment_time.strftime("%H:%M")
+        else:
+            current_time = instance.appointment_time
+        return (
+            (salon.pk if salon else None) != instance.salon_id
+            or date_value != instance.appointment_date
+            or time_value != current_time
+        )
 
     def clean(self):
         """Общая валидация формы"""
@@ -47,19 +84,16 @@ class BaseAppointmentForm(forms.ModelForm):
         if appointment_date and appointment_time:
             validate_appointment_datetime(appointment_date, appointment_time)
 
-            # Проверка на занятость времени у мастера
-            if master:
-                appointments = Appointment.objects.filter(
-                    master=master,
-                    appointment_date=appointment_date,
-                    appointment_time=appointment_time,
-                    status__in=["pending", "confirmed"],
-                )
-
-                if self.instance and self.instance.pk:
-                    appointments = appointments.exclude(pk=self.instance.pk)
-
-                if appointments.exists():
+            # Проверка на занятость времени у мастера с учетом длительности услуг
+            service = cleaned_data.get("service")
+            if master and service:
+                if not is_slot_free(
+                    master.pk,
+                    appointment_date,
+                    appointment_time,
+                    service.duration,
+                    exclude_pk=self.instance.pk if self.instance else None,
+                ):
                     raise ValidationError(
                         f"У мастера {master.name} уже есть запись на {appointment_date} в {appointment_time}"
                     )
@@ -73,20 +107,17 @@ class AppointmentAdminForm(BaseAppointmentForm):
     appointment_time = forms.ChoiceField(
         choices=[],
         label="Время записи",
-        help_text="Время с 10:00 до 19:00 с шагом 30 минут",
+        help_text="Время в часы работы салона с шагом 30 минут",
     )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Генерируем список времени
+        # Список времени: слоты, в которые работает хотя бы один салон
         time_choices = []
-        for hour in range(10, 20):
-            for minute in (0, 30):
-                if hour == 19 and minute == 30:
-                    break
-                time_str = f"{hour:02d}:{minute:02d}"
-                time_choices.append((time_str, time_str))
+        for index in iter_slots(all_working_mask()):
+            time_str = slot_time(index).strftime("%H:%M")
+            time_choices.append((time_str, time_str))
 
         self.fields["appointment_time"].choices = [("", "---------")] + time_choices
 
@@ -106,7 +137,7 @@ class AppointmentAdminForm(BaseAppointmentForm):
         time_str = self.cleaned_data.get("appointment_time")
         if not time_str:
             return None
-        return validate_working_hours(time_str)
+        return self._validate_working_hours(time_str)
 
 
 class AppointmentForm(BaseAppointmentForm):
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from timeit import timeit
+from zoneinfo import ZoneInfo
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ...models import Service
+from ...utils.availability import (
+    WORKING_MASK,
+    bookable_mask,
+    earliest_start,
+    expand_busy_mask,
+    iter_slots,
+    slot_time,
+)
+
+
+def legacy_filter(date, busy_times):
+    """Прежний отбор слотов: список занятых и часовой пояс на каждый слот"""
+    slots = []
+    current = datetime.combine(date, datetime.strptime("10:00", "%H:%M").time())
+    end = datetime.combine(date, datetime.strptime("19:00", "%H:%M").time())
+    while current < end:
+        slots.append(current.time())
+        current += timedelta(minutes=30)
+
+    available = []
+    for slot in slots:
+        if slot not in busy_times:
+            now = datetime.now(ZoneInfo("Europe/Moscow"))
+            slot_datetime = datetime.combine(date, slot, ZoneInfo("Europe/Moscow"))
+            if slot_datetime > now + timedelta(hours=1):
+                available.append(slot.strftime("%H:%M"))
+    return available
+
+
+def mask_filter(dates, busy_mask, duration):
+    """Отбор слотов битовыми масками с однократным расчетом текущего времени"""
+    earliest = earliest_start()
+    expanded = expand_busy_mask(busy_mask, duration)
+    return [
+        [
+            slot_time(index).strftime("%H:%M")
+            for index in iter_slots(bookable_mask(date, earliest) & ~expanded)
+        ]
+        for date in dates
+    ]
+
+
+class Command(BaseCommand):
+    help = "Сравнить скорость расчета свободного времени услуги"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--service", type=int, help="ID услуги")
+        parser.add_argument("--days", type=int, default=30, help="Количество дат")
+        parser.add_argument("--number", type=int, default=200, help="Повторов на замер")
+
+    def handle(self, *args, **options):
+        services = Service.objects.filter(is_active=True)
+        if options["service"]:
+            services = services.filter(id=options["service"])
+        service = services.first()
+        if service is None:
+            raise CommandError("Активная услуга не найдена")
+
+        today = timezone.localdate()
+        dates = [today + timedelta(days=i) for i in range(options["days"])]
+        number = options["number"]
+
+        # Занятость: каждый третий слот рабочего дня
+        busy_mask = 0
+        for position, index in enumerate(iter_slots(WORKING_MASK)):
+            if position % 3 == 0:
+                busy_mask |= 1 << index
+        busy_times = [slot_time(index) for index in iter_slots(busy_mask)]
+
+        legacy = timeit(
+            lambda: [legacy_filter(date, busy_times) for date in dates], number=number
+        )
+        masks = timeit(lambda: mask_filter(dates, busy_mask, 30), number=number)
+        self.stdout.write(f"Отбор слотов на {len(dates)} дат, {number} повторов:")
+        self.stdout.write(f"  прежний способ: {legacy * 1000 / number:.3f} мс")
+        self.stdout.write(f"  битовые маски:  {masks * 1000 / number:.3f} мс")
+        self.stdout.write(f"  ускорение:      x{legacy / masks:.1f}")
+
+        with CaptureQueriesContext(connection) as per_date:
+            for date in dates:
+                service.get_available_times(date)
+        with CaptureQueriesContext(connection) as batched:
+            service.get_available_times_for_dates(dates)
+
+        self.stdout.write(f"Запросы к базе для услуги «{service.name}»:")
+        self.stdout.write(f"  по одной дате:  {len(per_date.captured_queries)}")
+        self.stdout.write(f"  все даты сразу: {len(batched.captured_queries)}")
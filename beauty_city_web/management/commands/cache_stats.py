@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from ...utils.cache import get_cache_stats
+from ...utils.pagecache import CACHE_NAMESPACES
+
+NAMESPACES = (
+    *CACHE_NAMESPACES,
+    "catalog_snapshot",
+    "service_tree",
+    "salon_schedule",
+    "available_times",
+    "client_statistics",
+)
+
+
+class Command(BaseCommand):
+    help = "Показать попадания и промахи кэша страниц, разделов и данных"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "namespaces", nargs="*", help="Пространства имен, по умолчанию все"
+        )
+
+    def handle(self, *args, **options):
+        for namespace in options["namespaces"] or NAMESPACES:
+            stats = get_cache_stats(namespace)
+            self.stdout.write(
+                f"{namespace}: попаданий {stats['hits']}, "
+                f"промахов {stats['misses']}, "
+                f"доля попаданий {stats['hit_rate']:.1%}"
+            )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from ...utils.booking import expire_holds
+
+
+class Command(BaseCommand):
+    help = (
+        "Удалить просроченные удержания слотов. "
+        "Запускается периодически, например раз в минуту из cron"
+    )
+
+    def handle(self, *args, **options):
+        deleted = expire_holds()
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено просроченных удержаний: {deleted}")
+        )
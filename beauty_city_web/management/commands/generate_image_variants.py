@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Master, Salon, Service
+from ...utils.images import generate_variants, needs_variants
+
+
+class Command(BaseCommand):
+    help = "Подготовить уменьшенные копии фото салонов, услуг и мастеров"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Пересоздать копии для всех фото",
+        )
+
+    def handle(self, *args, **options):
+        for model in (Salon, Service, Master):
+            done = 0
+            for instance in model.objects.only("photo", "photo_variants"):
+                if options["force"] or needs_variants(instance):
+                    generate_variants(model, instance.pk)
+                    done += 1
+            self.stdout.write(
+                f"{model._meta.verbose_name_plural}: обработано фото {done}"
+            )
+        self.stdout.write(self.style.SUCCESS("Готово"))
@@ -0,0 +1,59 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils.importer import BookingImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Загрузить клиентов и записи из файла CSV или JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу выгрузки")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Формат файла, по умолчанию по расширению",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Количество строк в одной транзакции",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("Размер пачки должен быть положительным")
+
+        started = monotonic()
+
+        def report(importer):
+            elapsed = monotonic() - started
+            self.stdout.write(
+                f"Обработано строк: {importer.rows} "
+                f"({importer.rows / elapsed:.0f} строк/с), "
+                f"записей: {importer.appointments_created}, "
+                f"ошибок: {len(importer.errors)}"
+            )
+
+        importer = BookingImporter(batch_size=options["batch_size"])
+        try:
+            importer.import_rows(
+                read_rows(options["path"], options["format"]), on_batch=report
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        for line, message in importer.errors:
+            self.stderr.write(f"Строка {line}: {message}")
+
+        elapsed = monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Готово за {elapsed:.1f} с: клиентов создано {importer.clients_created}, "
+                f"обновлено {importer.clients_updated}, "
+                f"записей создано {importer.appointments_created}, "
+                f"ошибок {len(importer.errors)}"
+            )
+        )
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...utils.availability import rebuild_day_availability
+
+
+class Command(BaseCommand):
+    help = "Пересобрать таблицу занятости мастеров по записям"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--since",
+            help="Пересобрать только даты начиная с указанной (ГГГГ-ММ-ДД)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Размер пакета при записи в базу",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.strptime(options["since"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("Дата должна быть в формате ГГГГ-ММ-ДД")
+
+        count = rebuild_day_availability(since, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано дней мастеров: {count}"))
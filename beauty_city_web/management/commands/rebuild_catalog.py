@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ...utils.catalog import rebuild_catalog
+
+
+class Command(BaseCommand):
+    help = "Пересобрать снимок каталога салонов, услуг и мастеров"
+
+    def handle(self, *args, **options):
+        catalog = rebuild_catalog()
+        data = catalog["data"]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Снимок каталога {catalog['etag']}: "
+                f"салонов {len(data['salons'])}, "
+                f"услуг {len(data['services'])}, "
+                f"мастеров {len(data['masters'])}"
+            )
+        )
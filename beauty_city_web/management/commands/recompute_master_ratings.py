@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Master
+from ...utils.cache import bump_version, touch_stamp
+from ...utils.catalog import CATALOG_VERSION
+from ...utils.ratings import recompute_master_ratings
+
+
+class Command(BaseCommand):
+    help = "Пересчитать рейтинг и число отзывов всех мастеров по отзывам"
+
+    def handle(self, *args, **options):
+        updated = recompute_master_ratings()
+        # UPDATE не вызывает сигналы, сбрасываем кэши сами
+        bump_version(*CATALOG_VERSION)
+        touch_stamp(Master)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано мастеров: {updated}"))
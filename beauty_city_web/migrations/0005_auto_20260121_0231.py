@@ -4,29 +4,23 @@ from django.db import migrations
 
 
 def photo_to_service(Service, service_id, photo_id):
-    service = Service.objects.get(id=service_id)
-    service.photo = f"services/service{photo_id}.svg"
-    service.save()
+    Service.objects.filter(id=service_id).update(
+        photo=f"services/service{photo_id}.svg"
+    )
 
 
 def add_files_to_models(apps, schema_editor):
     Master = apps.get_model('beauty_city_web', 'Master')
     for id in range(1, 5):
-        master = Master.objects.get(id=id)
-        master.photo = f"masters/master{id}.svg"
-        master.save()
+        Master.objects.filter(id=id).update(photo=f"masters/master{id}.svg")
 
     Salon = apps.get_model('beauty_city_web', 'Salon')
     for id in range(1, 4):
-        salon = Salon.objects.get(id=id)
-        salon.photo = f"salons/salon{id}.svg"
-        salon.save()
+        Salon.objects.filter(id=id).update(photo=f"salons/salon{id}.svg")
 
     Service = apps.get_model('beauty_city_web', 'Service')
     for id in range(1, 4):
-        service = Service.objects.get(id=id)
-        service.photo = "services/service1.svg"
-        service.save()
+        Service.objects.filter(id=id).update(photo="services/service1.svg")
     photo_to_service(Service, 4, 6)
     photo_to_service(Service, 5, 3)
     photo_to_service(Service, 6, 2)
@@ -6,6 +6,9 @@ from django.db import migrations, transaction
 def add_reviews(apps, schema_editor):
     Client = Review = apps.get_model('beauty_city_web', 'Client')
     client = Client.objects.all()
+    # Демонстрационные отзывы нужны только базе с демонстрационными клиентами
+    if client.count() < 5:
+        return
 
     Review = apps.get_model('beauty_city_web', 'Review')
 
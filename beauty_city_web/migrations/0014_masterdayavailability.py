@@ -0,0 +1,52 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_availability(apps, schema_editor):
+    Appointment = apps.get_model('beauty_city_web', 'Appointment')
+    MasterDayAvailability = apps.get_model('beauty_city_web', 'MasterDayAvailability')
+
+    masks = {}
+    rows = Appointment.objects.filter(status__in=['pending', 'confirmed']).values_list(
+        'master_id', 'salon_id', 'appointment_date', 'appointment_time', 'service__duration'
+    )
+    for master_id, salon_id, date, start_time, duration in rows:
+        start = start_time.hour * 60 + start_time.minute
+        end = start + (duration or 30)
+        for index in range(start // 30, (end - 1) // 30 + 1):
+            key = (master_id, salon_id, date)
+            masks[key] = masks.get(key, 0) | (1 << index)
+
+    MasterDayAvailability.objects.bulk_create(
+        MasterDayAvailability(master_id=master_id, salon_id=salon_id, date=date, busy_mask=mask)
+        for (master_id, salon_id, date), mask in masks.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beauty_city_web', '0013_alter_client_phone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MasterDayAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('busy_mask', models.BigIntegerField(default=0, verbose_name='Занятые слоты')),
+                ('master', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_availability', to='beauty_city_web.master', verbose_name='Мастер')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_availability', to='beauty_city_web.salon', verbose_name='Салон')),
+            ],
+            options={
+                'verbose_name': 'Занятость мастера',
+                'verbose_name_plural': 'Занятость мастеров',
+                'indexes': [models.Index(fields=['date', 'master'], name='beauty_city_date_e929a5_idx')],
+                'constraints': [models.UniqueConstraint(fields=('master', 'salon', 'date'), name='unique_master_salon_date_availability')],
+            },
+        ),
+        migrations.RunPython(fill_availability, migrations.RunPython.noop),
+    ]
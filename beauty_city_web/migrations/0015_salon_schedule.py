@@ -0,0 +1,45 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('beauty_city_web', '0014_masterdayavailability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalonClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('reason', models.CharField(blank=True, max_length=200, verbose_name='Причина')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='closures', to='beauty_city_web.salon', verbose_name='Салон')),
+            ],
+            options={
+                'verbose_name': 'Выходной день салона',
+                'verbose_name_plural': 'Выходные дни салонов',
+                'ordering': ['date'],
+                'constraints': [models.UniqueConstraint(fields=('salon', 'date'), name='unique_salon_closure_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SalonWorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Понедельник'), (1, 'Вторник'), (2, 'Среда'), (3, 'Четверг'), (4, 'Пятница'), (5, 'Суббота'), (6, 'Воскресенье')], verbose_name='День недели')),
+                ('opens_at', models.TimeField(verbose_name='Открытие')),
+                ('closes_at', models.TimeField(verbose_name='Закрытие')),
+                ('salon', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='opening_hours', to='beauty_city_web.salon', verbose_name='Салон')),
+            ],
+            options={
+                'verbose_name': 'Часы работы',
+                'verbose_name_plural': 'Часы работы',
+                'ordering': ['weekday'],
+                'constraints': [models.UniqueConstraint(fields=('salon', 'weekday'), name='unique_salon_weekday_hours')],
+            },
+        ),
+    ]
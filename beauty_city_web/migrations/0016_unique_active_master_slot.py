@@ -0,0 +1,44 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:13
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def cancel_duplicate_slots(apps, schema_editor):
+    """Отменить повторные активные записи на один слот мастера.
+
+    Остается самая ранняя запись, иначе уникальное ограничение
+    не создастся на базе, где слот уже был занят дважды.
+    """
+    Appointment = apps.get_model("beauty_city_web", "Appointment")
+    active = Appointment.objects.filter(status__in=["pending", "confirmed"])
+    duplicates = (
+        active.values("master", "appointment_date", "appointment_time")
+        .annotate(first_id=Min("id"), total=Count("id"))
+        .filter(total__gt=1)
+    )
+    for slot in duplicates:
+        active.filter(
+            master=slot["master"],
+            appointment_date=slot["appointment_date"],
+            appointment_time=slot["appointment_time"],
+        ).exclude(id=slot["first_id"]).update(status="cancelled")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beauty_city_web", "0015_salon_schedule"),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_duplicate_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="appointment",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["pending", "confirmed"])),
+                fields=("master", "appointment_date", "appointment_time"),
+                name="unique_active_master_slot",
+            ),
+        ),
+    ]
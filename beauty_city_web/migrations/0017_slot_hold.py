@@ -0,0 +1,78 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beauty_city_web", "0016_unique_active_master_slot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SlotHold",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("appointment_date", models.DateField(verbose_name="Дата")),
+                ("appointment_time", models.TimeField(verbose_name="Время")),
+                (
+                    "session_key",
+                    models.CharField(
+                        db_index=True, max_length=40, verbose_name="Сессия"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Действует до"),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "master",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slot_holds",
+                        to="beauty_city_web.master",
+                        verbose_name="Мастер",
+                    ),
+                ),
+                (
+                    "salon",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slot_holds",
+                        to="beauty_city_web.salon",
+                        verbose_name="Салон",
+                    ),
+                ),
+                (
+                    "service",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="slot_holds",
+                        to="beauty_city_web.service",
+                        verbose_name="Услуга",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Удержание слота",
+                "verbose_name_plural": "Удержания слотов",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("master", "appointment_date", "appointment_time"),
+                        name="unique_master_slot_hold",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:29
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Avg, Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_review_stats(apps, schema_editor):
+    Master = apps.get_model("beauty_city_web", "Master")
+    Review = apps.get_model("beauty_city_web", "Review")
+    reviews = Review.objects.filter(master=OuterRef("pk")).values("master")
+    Master.objects.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("id")).values("count")), Value(0)
+        ),
+        avg_rating=Coalesce(
+            Subquery(reviews.annotate(avg=Avg("rating")).values("avg")), Value(0.0)
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beauty_city_web", "0017_slot_hold"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="master",
+            name="rating",
+        ),
+        migrations.AddField(
+            model_name="master",
+            name="avg_rating",
+            field=models.FloatField(
+                default=0.0,
+                editable=False,
+                validators=[
+                    django.core.validators.MinValueValidator(0),
+                    django.core.validators.MaxValueValidator(5),
+                ],
+                verbose_name="Рейтинг",
+            ),
+        ),
+        migrations.AddField(
+            model_name="master",
+            name="review_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Отзывов"
+            ),
+        ),
+        migrations.RunPython(fill_review_stats, migrations.RunPython.noop),
+    ]
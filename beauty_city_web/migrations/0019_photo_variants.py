@@ -0,0 +1,34 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beauty_city_web", "0018_master_review_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="master",
+            name="photo_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Копии фото"
+            ),
+        ),
+        migrations.AddField(
+            model_name="salon",
+            name="photo_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Копии фото"
+            ),
+        ),
+        migrations.AddField(
+            model_name="service",
+            name="photo_variants",
+            field=models.JSONField(
+                blank=True, default=dict, editable=False, verbose_name="Копии фото"
+            ),
+        ),
+    ]
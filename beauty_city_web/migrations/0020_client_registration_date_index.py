@@ -0,0 +1,20 @@
+# Generated by Django 6.1.2 on 2026-10-17 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("beauty_city_web", "0019_photo_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="client",
+            name="registration_date",
+            field=models.DateTimeField(
+                auto_now_add=True, db_index=True, verbose_name="Дата регистрации"
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from .salon import Salon
+from .salonschedule import SalonWorkingHours, SalonClosure
 from .service import ServiceCategory
 from .service import Service
 from .master import Master
@@ -7,9 +8,13 @@ from .promocode import PromoCode
 from .appointment import Appointment
 from .review import Review
 from .consultation import Consultation
+from .masterdayavailability import MasterDayAvailability
+from .slothold import SlotHold
 
 __all__ = [
     "Salon",
+    "SalonWorkingHours",
+    "SalonClosure",
     "ServiceCategory",
     "Service",
     "Master",
@@ -18,4 +23,6 @@ __all__ = [
     "Appointment",
     "Review",
     "Consultation",
+    "MasterDayAvailability",
+    "SlotHold",
 ]
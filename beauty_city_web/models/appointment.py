@@ -62,22 +62,21 @@ class Appointment(models.Model):
     notes = models.TextField(blank=True, verbose_name="Примечания")
 
     def save(self, *args, **kwargs):
-        """Переопределяем save для расчета цен и валидации времени"""
+        """Переопределяем save для расчета цен и валидации времени.
 
-        if self.appointment_time:
-            hour = self.appointment_time.hour
-            minute = self.appointment_time.minute
+        Часы работы салона проверяют формы и API при выборе времени:
+        после изменения расписания существующие записи должны
+        оставаться доступными для отмены и смены статуса.
+        """
 
-            if hour < 10 or hour > 19:
-                raise ValueError("Время должно быть с 10:00 до 19:00")
-
-            if minute not in [0, 30]:
-                raise ValueError("Время должно быть с шагом 30 минут")
+        if self.appointment_time and self.appointment_time.minute not in [0, 30]:
+            raise ValueError("Время должно быть с шагом 30 минут")
 
         if not self.original_price and self.service:
             self.original_price = self.service.price
 
-        if self.promo_code and self.promo_code.is_valid():
+        # calculate_discount сам проверяет срок действия промокода
+        if self.promo_code:
             self.discount_amount = self.promo_code.calculate_discount(
                 self.original_price
             )
@@ -94,3 +93,10 @@ class Appointment(models.Model):
         verbose_name = "Запись"
         verbose_name_plural = "Записи"
         ordering = ["-id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["master", "appointment_date", "appointment_time"],
+                condition=models.Q(status__in=["pending", "confirmed"]),
+                name="unique_active_master_slot",
+            )
+        ]
@@ -1,6 +1,4 @@
 from django.db import models
-from django.db.models import Count
-from datetime import date, timedelta
 from phonenumber_field.modelfields import PhoneNumberField
 from django.core.validators import MinLengthValidator, RegexValidator, EmailValidator
 
@@ -27,7 +25,7 @@ class Client(models.Model):
     email = models.EmailField(blank=True, verbose_name="Email",
         validators=[EmailValidator()])
     registration_date = models.DateTimeField(
-        auto_now_add=True, verbose_name="Дата регистрации"
+        auto_now_add=True, db_index=True, verbose_name="Дата регистрации"
     )
 
     def __str__(self):
@@ -43,32 +41,10 @@ class Client(models.Model):
         Получить статистику регистраций клиентов
         period: 'today', 'week', 'month', 'year' или None (все время)
         """
-        queryset = cls.objects.all()
+        from ..utils.statistics import build_client_statistics
 
-        today = date.today()
-        if period:
-
-            if period == "today":
-                queryset = queryset.filter(registration_date__date=today)
-            elif period == "week":
-                week_ago = today - timedelta(days=7)
-                queryset = queryset.filter(registration_date__date__gte=week_ago)
-            elif period == "month":
-                month_ago = today - timedelta(days=30)
-                queryset = queryset.filter(registration_date__date__gte=month_ago)
-            elif period == "year":
-                year_ago = today - timedelta(days=365)
-                queryset = queryset.filter(registration_date__date__gte=year_ago)
-
-        total_count = queryset.count()
-
-        thirty_days_ago = today - timedelta(days=30)
-        daily_stats = (
-            queryset.filter(registration_date__date__gte=thirty_days_ago)
-            .extra(select={"day": "DATE(registration_date)"})
-            .values("day")
-            .annotate(count=Count("id"))
-            .order_by("day")
-        )
-
-        return {"total_count": total_count, "daily_stats": list(daily_stats)}
+        stats = build_client_statistics(period)
+        return {
+            "total_count": stats["total_count"],
+            "daily_stats": stats["daily_stats"],
+        }
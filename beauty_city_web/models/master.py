@@ -9,13 +9,21 @@ class Master(models.Model):
     photo = models.FileField(
         upload_to="masters/", blank=True, null=True, verbose_name="Фото"
     )
+    photo_variants = models.JSONField(
+        default=dict, blank=True, editable=False, verbose_name="Копии фото"
+    )
     specialty = models.CharField(max_length=200, verbose_name="Специальность")
     experience = models.CharField(max_length=50, verbose_name="Стаж работы")
-    rating = models.FloatField(
-        default=5.0,
+    # Обновляются сигналами отзывов, пересчет - recompute_master_ratings
+    avg_rating = models.FloatField(
+        default=0.0,
+        editable=False,
         validators=[MinValueValidator(0), MaxValueValidator(5)],
         verbose_name="Рейтинг",
     )
+    review_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Отзывов"
+    )
     salons = models.ManyToManyField(
         "Salon", related_name="masters", verbose_name="Салоны"
     )
@@ -26,17 +34,12 @@ class Master(models.Model):
     order = models.IntegerField(default=0, verbose_name="Порядок отображения")
 
     def get_available_dates(self, days_ahead=30):
-        """Получить даты, когда мастер работает"""
-        from datetime import datetime, timedelta
+        """Получить даты, когда у мастера есть свободное время"""
+        from datetime import datetime
+        from ..utils.availability import get_master_calendar
 
-        dates = []
         today = datetime.now().date()
-
-        for i in range(days_ahead):
-            date = today + timedelta(days=i)
-            dates.append(date)
-
-        return dates
+        return get_master_calendar(self, today, days_ahead)
 
     def get_available_services(self, salon_id=None):
         """Получить услуги, которые предоставляет мастер"""
@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class MasterDayAvailability(models.Model):
+    """Занятость мастера в салоне за день"""
+
+    master = models.ForeignKey(
+        "Master",
+        on_delete=models.CASCADE,
+        related_name="day_availability",
+        verbose_name="Мастер",
+    )
+    salon = models.ForeignKey(
+        "Salon",
+        on_delete=models.CASCADE,
+        related_name="day_availability",
+        verbose_name="Салон",
+    )
+    date = models.DateField(verbose_name="Дата")
+    # Бит i - получасовой слот, начинающийся через i * 30 минут после полуночи
+    busy_mask = models.BigIntegerField(default=0, verbose_name="Занятые слоты")
+
+    def __str__(self):
+        return f"{self.master} - {self.salon} - {self.date}"
+
+    class Meta:
+        verbose_name = "Занятость мастера"
+        verbose_name_plural = "Занятость мастеров"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["master", "salon", "date"],
+                name="unique_master_salon_date_availability",
+            )
+        ]
+        indexes = [models.Index(fields=["date", "master"])]
@@ -20,6 +20,9 @@ class Salon(models.Model):
     photo = models.FileField(
         upload_to="salons/", blank=True, null=True, verbose_name="Фото"
     )
+    photo_variants = models.JSONField(
+        default=dict, blank=True, editable=False, verbose_name="Копии фото"
+    )
     is_active = models.BooleanField(default=True, verbose_name="Активен")
 
     def __str__(self):
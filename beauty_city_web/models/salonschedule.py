@@ -0,0 +1,71 @@
+from django.core.exceptions import ValidationError
+from django.db import models
+
+
+class SalonWorkingHours(models.Model):
+    """Часы работы салона в один из дней недели"""
+
+    WEEKDAYS = [
+        (0, "Понедельник"),
+        (1, "Вторник"),
+        (2, "Среда"),
+        (3, "Четверг"),
+        (4, "Пятница"),
+        (5, "Суббота"),
+        (6, "Воскресенье"),
+    ]
+
+    salon = models.ForeignKey(
+        "Salon",
+        on_delete=models.CASCADE,
+        related_name="opening_hours",
+        verbose_name="Салон",
+    )
+    weekday = models.PositiveSmallIntegerField(
+        choices=WEEKDAYS, verbose_name="День недели"
+    )
+    opens_at = models.TimeField(verbose_name="Открытие")
+    closes_at = models.TimeField(verbose_name="Закрытие")
+
+    def clean(self):
+        if self.opens_at and self.closes_at and self.opens_at >= self.closes_at:
+            raise ValidationError("Время закрытия должно быть позже открытия")
+
+    def __str__(self):
+        return f"{self.get_weekday_display()}: {self.opens_at:%H:%M}-{self.closes_at:%H:%M}"
+
+    class Meta:
+        verbose_name = "Часы работы"
+        verbose_name_plural = "Часы работы"
+        ordering = ["weekday"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["salon", "weekday"], name="unique_salon_weekday_hours"
+            )
+        ]
+
+
+class SalonClosure(models.Model):
+    """День, когда салон закрыт (праздник, санитарный день)"""
+
+    salon = models.ForeignKey(
+        "Salon",
+        on_delete=models.CASCADE,
+        related_name="closures",
+        verbose_name="Салон",
+    )
+    date = models.DateField(verbose_name="Дата")
+    reason = models.CharField(max_length=200, blank=True, verbose_name="Причина")
+
+    def __str__(self):
+        return f"{self.salon.name} - {self.date}"
+
+    class Meta:
+        verbose_name = "Выходной день салона"
+        verbose_name_plural = "Выходные дни салонов"
+        ordering = ["date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["salon", "date"], name="unique_salon_closure_date"
+            )
+        ]
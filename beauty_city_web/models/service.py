@@ -1,6 +1,5 @@
 from django.db import models
 from .servicecategory import ServiceCategory
-from .appointment import Appointment
 
 
 class Service(models.Model):
@@ -22,6 +21,9 @@ class Service(models.Model):
     photo = models.FileField(
         upload_to="services/", blank=True, null=True, verbose_name="Фото"
     )
+    photo_variants = models.JSONField(
+        default=dict, blank=True, editable=False, verbose_name="Копии фото"
+    )
     is_active = models.BooleanField(default=True, verbose_name="Активна")
     order = models.IntegerField(default=0, verbose_name="Порядок отображения")
 
@@ -34,47 +36,21 @@ class Service(models.Model):
 
     def get_available_times(self, date, master_id=None, salon_id=None):
         """Получить доступное время для услуги"""
-        from datetime import datetime, timedelta
-        import pytz
-
-        # Базовые рабочие часы
-        start_time = datetime.strptime("10:00", "%H:%M").time()
-        end_time = datetime.strptime("19:00", "%H:%M").time()
-
-        # Все возможные слоты
-        slots = []
-        current = datetime.combine(date, start_time)
-        end = datetime.combine(date, end_time)
+        return self.get_available_times_for_dates(
+            [date], master_id=master_id, salon_id=salon_id
+        )[date]
 
-        while current < end:
-            slots.append(current.time())
-            current += timedelta(minutes=30)
+    def get_available_times_for_dates(self, dates, master_id=None, salon_id=None):
+        """Получить доступное время для услуги на несколько дат одним запросом"""
+        from ..utils.availability import get_free_masks, iter_slots, slot_time
 
-        # Получаем занятые слоты
-        appointments = Appointment.objects.filter(
-            appointment_date=date, status__in=["pending", "confirmed"]
+        free_masks = get_free_masks(
+            dates, self.duration, master_id=master_id, salon_id=salon_id
         )
-
-        if master_id:
-            appointments = appointments.filter(master_id=master_id)
-        if salon_id:
-            appointments = appointments.filter(salon_id=salon_id)
-
-        busy_times = [a.appointment_time for a in appointments]
-
-        # Фильтруем свободные слоты
-        available_slots = []
-        for slot in slots:
-            if slot not in busy_times:
-                # Проверяем, что слот не в прошлом (для сегодняшней даты)
-                now = datetime.now(pytz.timezone("Europe/Moscow"))
-                slot_datetime = datetime.combine(date, slot)
-                slot_datetime = pytz.timezone("Europe/Moscow").localize(slot_datetime)
-
-                if slot_datetime > now + timedelta(hours=1):
-                    available_slots.append(slot.strftime("%H:%M"))
-
-        return available_slots
+        return {
+            date: [slot_time(index).strftime("%H:%M") for index in iter_slots(mask)]
+            for date, mask in free_masks.items()
+        }
 
     def __str__(self):
         return f"{self.name} - {self.price} руб."
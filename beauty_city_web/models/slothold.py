@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class SlotHold(models.Model):
+    """Временное удержание слота мастера на время оформления записи"""
+
+    master = models.ForeignKey(
+        "Master",
+        on_delete=models.CASCADE,
+        related_name="slot_holds",
+        verbose_name="Мастер",
+    )
+    salon = models.ForeignKey(
+        "Salon",
+        on_delete=models.CASCADE,
+        related_name="slot_holds",
+        verbose_name="Салон",
+    )
+    service = models.ForeignKey(
+        "Service",
+        on_delete=models.CASCADE,
+        related_name="slot_holds",
+        verbose_name="Услуга",
+    )
+    appointment_date = models.DateField(verbose_name="Дата")
+    appointment_time = models.TimeField(verbose_name="Время")
+    session_key = models.CharField(max_length=40, db_index=True, verbose_name="Сессия")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Действует до")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.master} - {self.appointment_date} {self.appointment_time}"
+
+    class Meta:
+        verbose_name = "Удержание слота"
+        verbose_name_plural = "Удержания слотов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["master", "appointment_date", "appointment_time"],
+                name="unique_master_slot_hold",
+            )
+        ]
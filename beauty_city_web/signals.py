@@ -0,0 +1,181 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    Appointment,
+    Client,
+    Master,
+    Review,
+    Salon,
+    SalonClosure,
+    SalonWorkingHours,
+    Service,
+    ServiceCategory,
+)
+from .utils.availability import active_appointments, refresh_day_availability
+from .utils.cache import bump_version, touch_stamp
+from .utils.catalog import CATALOG_VERSION
+from .utils.images import needs_variants, schedule_variants
+from .utils.ratings import apply_review_change
+
+
+def _availability_key(appointment):
+    return (appointment.master_id, appointment.salon_id, appointment.appointment_date)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_slot(sender, instance, raw=False, **kwargs):
+    """Запомнить прежние мастера, салон и дату записи перед переносом"""
+    instance._previous_availability_key = None
+    if instance.pk and not raw:
+        instance._previous_availability_key = (
+            Appointment.objects.filter(pk=instance.pk)
+            .values_list("master_id", "salon_id", "appointment_date")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Appointment)
+def update_availability_on_save(sender, instance, raw=False, **kwargs):
+    """Обновить занятость мастера после создания, отмены или переноса записи"""
+    if raw:
+        return
+
+    keys = {_availability_key(instance)}
+    previous = getattr(instance, "_previous_availability_key", None)
+    if previous:
+        keys.add(previous)
+
+    for key in keys:
+        refresh_day_availability(*key)
+
+
+@receiver(post_delete, sender=Appointment)
+def update_availability_on_delete(sender, instance, **kwargs):
+    """Освободить время мастера после удаления записи"""
+    refresh_day_availability(*_availability_key(instance))
+
+
+@receiver(pre_save, sender=Service)
+def remember_service_duration(sender, instance, raw=False, **kwargs):
+    """Запомнить прежнюю длительность услуги"""
+    instance._previous_duration = None
+    if instance.pk and not raw:
+        instance._previous_duration = (
+            Service.objects.filter(pk=instance.pk)
+            .values_list("duration", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Service)
+def update_availability_on_duration_change(sender, instance, raw=False, **kwargs):
+    """Пересчитать будущую занятость, если изменилась длительность услуги"""
+    previous = getattr(instance, "_previous_duration", None)
+    if raw or previous is None or previous == instance.duration:
+        return
+
+    bump_version("availability", "service", instance.pk)
+
+    keys = (
+        active_appointments()
+        .filter(service=instance, appointment_date__gte=timezone.now().date())
+        .values_list("master_id", "salon_id", "appointment_date")
+        .distinct()
+    )
+    for key in keys:
+        refresh_day_availability(*key)
+
+
+@receiver(post_save, sender=SalonWorkingHours)
+@receiver(post_delete, sender=SalonWorkingHours)
+@receiver(post_save, sender=SalonClosure)
+@receiver(post_delete, sender=SalonClosure)
+def invalidate_salon_schedule(sender, instance, **kwargs):
+    """Сбросить скомпилированное расписание салона"""
+    bump_version("salon_schedule", instance.salon_id)
+    touch_stamp(sender)
+
+
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+@receiver(post_save, sender=Master)
+@receiver(post_delete, sender=Master)
+@receiver(post_save, sender=Salon)
+@receiver(post_delete, sender=Salon)
+def invalidate_catalog(sender, raw=False, **kwargs):
+    """Сбросить закэшированное дерево услуг"""
+    if not raw:
+        bump_version(*CATALOG_VERSION)
+        touch_stamp(sender)
+
+
+@receiver(m2m_changed, sender=Master.services.through)
+@receiver(m2m_changed, sender=Master.salons.through)
+def invalidate_catalog_links(sender, action, **kwargs):
+    """Сбросить дерево услуг при изменении услуг или салонов мастера"""
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_version(*CATALOG_VERSION)
+        touch_stamp(Master)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, raw=False, **kwargs):
+    """Запомнить прежних мастера и оценку отзыва"""
+    instance._previous_rating = None
+    if instance.pk and not raw:
+        instance._previous_rating = (
+            Review.objects.filter(pk=instance.pk)
+            .values_list("master_id", "rating")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def update_master_rating_on_save(sender, instance, raw=False, **kwargs):
+    """Учесть новый или измененный отзыв в рейтинге мастера"""
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_rating", None)
+    if previous is None:
+        apply_review_change(instance.master_id, 1, instance.rating)
+    elif previous[0] != instance.master_id:
+        apply_review_change(previous[0], -1, -previous[1])
+        apply_review_change(instance.master_id, 1, instance.rating)
+    elif previous[1] != instance.rating:
+        apply_review_change(instance.master_id, 0, instance.rating - previous[1])
+
+
+@receiver(post_delete, sender=Review)
+def update_master_rating_on_delete(sender, instance, **kwargs):
+    """Исключить удаленный отзыв из рейтинга мастера"""
+    apply_review_change(instance.master_id, -1, -instance.rating)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_reviews(sender, raw=False, **kwargs):
+    """Сбросить закэшированные отзывы и рейтинг мастеров в каталоге"""
+    if not raw:
+        bump_version(*CATALOG_VERSION)
+        touch_stamp(Review, Master)
+
+
+@receiver(post_save, sender=Client)
+def invalidate_client_reviews(sender, instance, created, raw=False, **kwargs):
+    """Имя клиента выводится в его отзывах"""
+    if not raw and not created and Review.objects.filter(client=instance).exists():
+        touch_stamp(Review)
+
+
+@receiver(post_save, sender=Salon)
+@receiver(post_save, sender=Service)
+@receiver(post_save, sender=Master)
+def prepare_photo_variants(sender, instance, raw=False, **kwargs):
+    """Подготовить уменьшенные копии нового фото"""
+    if not raw and needs_variants(instance):
+        schedule_variants(instance)
@@ -0,0 +1,24 @@
+from django import template
+from django.utils.html import format_html
+
+from ..utils.images import photo_srcset
+
+register = template.Library()
+
+DEFAULT_SIZES = "(max-width: 767px) 100vw, 320px"
+
+
+@register.simple_tag
+def srcset_attrs(instance, sizes=DEFAULT_SIZES):
+    """Атрибуты srcset и sizes для фото объекта, если копии готовы.
+
+    <img src="{{ master.photo.url }}"{% srcset_attrs master %}>
+    """
+    srcset = photo_srcset(instance)
+    if not srcset:
+        return ""
+    return format_html(
+        ' srcset="{}" sizes="{}"',
+        ", ".join(f"{url} {width}w" for width, url in srcset.items()),
+        sizes,
+    )
@@ -0,0 +1,48 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..utils.pagecache import PAGE_SECTIONS, get_fragment
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, sections):
+        self.nodelist = nodelist
+        self.name = name
+        self.sections = sections
+
+    def render(self, context):
+        return mark_safe(
+            get_fragment(
+                context.get("request"),
+                self.name,
+                self.sections,
+                lambda: self.nodelist.render(context),
+            )
+        )
+
+
+@register.tag
+def cached_fragment(parser, token):
+    """Раздел страницы из кэша.
+
+    {% cached_fragment "index_masters" "masters" %}...{% endcached_fragment %}
+    Первый аргумент - имя фрагмента, остальные - разделы из PAGE_SECTIONS,
+    от данных которых он зависит.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"{bits[0]} принимает имя фрагмента и хотя бы один раздел"
+        )
+    name, *sections = (bit.strip("\"'") for bit in bits[1:])
+    unknown = set(sections) - set(PAGE_SECTIONS)
+    if unknown:
+        raise template.TemplateSyntaxError(
+            f"Неизвестные разделы: {', '.join(sorted(unknown))}"
+        )
+
+    nodelist = parser.parse(("endcached_fragment",))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, name, sections)
@@ -1,3 +1,1416 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    Client as HttpClient,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .forms import AppointmentAdminForm
+from .models import (
+    Appointment,
+    Client,
+    Consultation,
+    Master,
+    MasterDayAvailability,
+    PromoCode,
+    Review,
+    Salon,
+    SalonClosure,
+    SalonWorkingHours,
+    Service,
+    ServiceCategory,
+    SlotHold,
+)
+from .utils.availability import DaySchedule, get_salon_schedule
+from .utils.booking import (
+    SlotUnavailableError,
+    book_appointment,
+    expire_due_holds,
+    expire_holds,
+)
+from .utils.cache import get_cache_stats
+from .utils.ratings import recompute_master_ratings
+from .views.public import INDEX_REVIEWS_LIMIT
+
+
+class BookingDataMixin:
+    """Общие тестовые данные: салон, услуга, мастер и клиент"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.salon = Salon.objects.create(name="BeautyCity", address="ул. Ленина, 1")
+        cls.category = ServiceCategory.objects.create(name="Макияж", order=1)
+        cls.service = Service.objects.create(
+            name="Дневной макияж", category=cls.category, price=1400, duration=30
+        )
+        cls.master = Master.objects.create(
+            name="Ева Колесова", specialty="Визажист", experience="2 г."
+        )
+        cls.master.salons.add(cls.salon)
+        cls.master.services.add(cls.service)
+        cls.client_obj = Client.objects.create(name="Анна", phone="+79991234567")
+        cls.day = date.today() + timedelta(days=1)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    @classmethod
+    def book(cls, appointment_time, **kwargs):
+        fields = {
+            "client": cls.client_obj,
+            "master": cls.master,
+            "service": cls.service,
+            "salon": cls.salon,
+            "appointment_date": cls.day,
+            "appointment_time": appointment_time,
+            "original_price": cls.service.price,
+            "final_price": cls.service.price,
+        }
+        fields.update(kwargs)
+        return Appointment.objects.create(**fields)
+
+    def warm_caches(self):
+        """Прогреть расписание салона и срок удержаний до замера запросов"""
+        get_salon_schedule(self.salon.id)
+        expire_due_holds()
+
+    def get_times(self, **params):
+        """Свободное время из api_available_times, по умолчанию на self.day"""
+        params.setdefault("date", self.day.isoformat())
+        response = self.client.get(
+            reverse("beauty_city_web:api_available_times"), params
+        )
+        self.assertEqual(response.status_code, 200)
+        return [t for group in response.json()["times"] for t in group["times"]]
+
+
+class AvailableTimesTests(BookingDataMixin, TestCase):
+    def test_busy_slots_are_excluded(self):
+        self.book(time(10, 0))
+        self.book(time(15, 30), status="cancelled")
+
+        times = self.get_times(master_id=self.master.id)
+
+        self.assertNotIn("10:00", times)
+        self.assertIn("15:30", times)
+        self.assertEqual(times[0], "10:30")
+        self.assertEqual(times[-1], "19:30")
+
+    def test_single_query_for_all_slots(self):
+        for hour in range(10, 19):
+            self.book(time(hour, 0))
+
+        self.warm_caches()
+        with self.assertNumQueries(1):
+            times = self.get_times(
+                master_id=self.master.id,
+                service_id=self.service.id,
+                salon_id=self.salon.id,
+            )
+
+        self.assertEqual(len(times), 11)
+        self.assertTrue(all(t.endswith(":30") or t == "19:00" for t in times))
+
+
+class AvailableDatesSimpleTests(BookingDataMixin, TestCase):
+    url = reverse("beauty_city_web:api_available_dates_simple")
+
+    def test_fully_booked_day_is_excluded(self):
+        for hour in range(10, 20):
+            self.book(time(hour, 0))
+            self.book(time(hour, 30))
+
+        response = self.client.get(self.url, {"master_id": self.master.id})
+        dates = [d["date"] for d in response.json()["dates"]]
+
+        self.assertNotIn(self.day.isoformat(), dates)
+        self.assertEqual(len(dates), 29)
+
+    def test_horizon_costs_one_query(self):
+        self.book(time(10, 0))
+
+        self.warm_caches()
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url, {"salon_id": self.salon.id, "days": 90}
+            )
+
+        self.assertEqual(len(response.json()["dates"]), 90)
+
+
+class MasterCalendarTests(BookingDataMixin, TestCase):
+    def test_fully_booked_day_is_not_available(self):
+        for hour in range(10, 20):
+            self.book(time(hour, 0))
+            self.book(time(hour, 30))
+
+        dates = self.master.get_available_dates()
+
+        self.assertNotIn(self.day, dates)
+        self.assertIn(self.day + timedelta(days=1), dates)
+
+    def test_view_query_count_does_not_depend_on_horizon(self):
+        self.book(time(10, 0))
+        url = reverse("beauty_city_web:api_available_dates")
+
+        self.warm_caches()
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {"master_id": self.master.id, "days": 90})
+
+        self.assertGreaterEqual(len(response.json()["dates"]), 89)
+
+
+class DurationAwareSchedulingTests(BookingDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.coloring = Service.objects.create(
+            name="Окрашивание волос", category=cls.category, price=5000, duration=120
+        )
+        cls.master.services.add(cls.coloring)
+
+    def test_schedule_overlaps(self):
+        schedule = DaySchedule([(600, 720), (690, 750), (900, 930)])
+
+        self.assertEqual(len(schedule), 2)
+        self.assertTrue(schedule.overlaps(720, 780))
+        self.assertFalse(schedule.overlaps(750, 900))
+        self.assertTrue(schedule.overlaps(570, 601))
+        self.assertFalse(schedule.overlaps(930, 960))
+
+        schedule.add(time(12, 30), 150)
+        self.assertEqual(list(zip(schedule.starts, schedule.ends)), [(600, 930)])
+        schedule.add(time(17, 0), 30)
+        self.assertFalse(schedule.is_free(time(16, 30), 60))
+        self.assertTrue(schedule.is_free(time(16, 0), 60))
+
+    def test_long_service_blocks_following_slots(self):
+        self.book(time(10, 0), service=self.coloring)
+
+        times = self.get_times(master_id=self.master.id)
+
+        for busy in ("10:00", "10:30", "11:00", "11:30"):
+            self.assertNotIn(busy, times)
+        self.assertEqual(times[0], "12:00")
+
+    def test_candidate_duration_is_respected(self):
+        self.book(time(12, 0))
+
+        self.warm_caches()
+        with self.assertNumQueries(1):
+            times = self.get_times(
+                master_id=self.master.id, service_id=self.coloring.id
+            )
+
+        self.assertEqual(times[:2], ["10:00", "12:30"])
+
+    def test_service_ends_before_closing(self):
+        self.assertEqual(self.get_times(master_id=self.master.id)[-1], "19:30")
+        times = self.get_times(master_id=self.master.id, service_id=self.coloring.id)
+        self.assertEqual(times[-1], "18:00")
+
+        form = AppointmentAdminForm(
+            data={
+                "client": self.client_obj.pk,
+                "master": self.master.pk,
+                "service": self.coloring.pk,
+                "salon": self.salon.pk,
+                "appointment_date": self.day.isoformat(),
+                "appointment_time": "18:30",
+                "status": "pending",
+            }
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn("appointment_time", form.errors)
+
+    def test_admin_form_rejects_overlap(self):
+        self.book(time(10, 0), service=self.coloring)
+        form = AppointmentAdminForm(
+            data={
+                "client": self.client_obj.pk,
+                "master": self.master.pk,
+                "service": self.service.pk,
+                "salon": self.salon.pk,
+                "appointment_date": self.day.isoformat(),
+                "appointment_time": "11:30",
+                "status": "pending",
+            }
+        )
+
+        self.assertFalse(form.is_valid())
+        self.assertIn("__all__", form.errors)
+
+
+class MasterDayAvailabilityTests(BookingDataMixin, TestCase):
+    def busy_mask(self, day=None):
+        row = MasterDayAvailability.objects.filter(
+            master=self.master, salon=self.salon, date=day or self.day
+        ).first()
+        return row.busy_mask if row else 0
+
+    def test_booking_cancel_and_reschedule_update_mask(self):
+        appointment = self.book(time(10, 0))
+        self.assertEqual(self.busy_mask(), 1 << 20)
+
+        appointment.appointment_date = self.day + timedelta(days=1)
+        appointment.save()
+        self.assertEqual(self.busy_mask(), 0)
+        self.assertEqual(self.busy_mask(self.day + timedelta(days=1)), 1 << 20)
+
+        appointment.status = "cancelled"
+        appointment.save()
+        self.assertFalse(MasterDayAvailability.objects.exists())
+
+    def test_service_duration_change_updates_mask(self):
+        self.book(time(10, 0))
+
+        self.service.duration = 90
+        self.service.save()
+
+        self.assertEqual(self.busy_mask(), 0b111 << 20)
+
+    def test_rebuild_command(self):
+        self.book(time(10, 0))
+        self.book(time(11, 0))
+        MasterDayAvailability.objects.all().delete()
+
+        call_command("rebuild_availability", stdout=StringIO())
+
+        self.assertEqual(self.busy_mask(), 0b101 << 20)
+
+
+class AvailabilityCacheTests(BookingDataMixin, TestCase):
+    def test_repeated_request_is_served_from_cache(self):
+        self.get_times(master_id=self.master.id)
+
+        with self.assertNumQueries(0):
+            self.get_times(master_id=self.master.id)
+
+        self.assertEqual(
+            get_cache_stats("available_times"),
+            {"hits": 1, "misses": 1, "hit_rate": 0.5},
+        )
+
+    def test_booking_invalidates_only_affected_master(self):
+        other = Master.objects.create(
+            name="Ольга", specialty="Визажист", experience="1 г."
+        )
+        self.get_times(master_id=self.master.id)
+        self.get_times(master_id=other.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(time(10, 0))
+
+        self.assertNotIn("10:00", self.get_times(master_id=self.master.id))
+        with self.assertNumQueries(0):
+            self.assertIn("10:00", self.get_times(master_id=other.id))
+
+    def test_version_changes_only_after_commit(self):
+        self.get_times(master_id=self.master.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(time(10, 0))
+            with self.assertNumQueries(0):
+                self.assertIn("10:00", self.get_times(master_id=self.master.id))
+
+        self.assertNotIn("10:00", self.get_times(master_id=self.master.id))
+
+    def test_rebuild_invalidates_cached_days(self):
+        self.get_times(master_id=self.master.id)
+        Appointment.objects.bulk_create(
+            [
+                Appointment(
+                    client=self.client_obj,
+                    master=self.master,
+                    service=self.service,
+                    salon=self.salon,
+                    appointment_date=self.day,
+                    appointment_time=time(10, 0),
+                    original_price=self.service.price,
+                    final_price=self.service.price,
+                )
+            ]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("rebuild_availability", stdout=StringIO())
+
+        self.assertNotIn("10:00", self.get_times(master_id=self.master.id))
+
+
+class AvailabilityGridTests(BookingDataMixin, TestCase):
+    def test_grid_encodes_free_slots_per_master_and_day(self):
+        other = Master.objects.create(
+            name="Ольга", specialty="Визажист", experience="1 г."
+        )
+        other.salons.add(self.salon)
+        other.services.add(self.service)
+        self.book(time(10, 0))
+
+        self.warm_caches()
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("beauty_city_web:api_availability_grid"),
+                {
+                    "salon_id": self.salon.id,
+                    "service_id": self.service.id,
+                    "date_from": self.day.isoformat(),
+                    "days": 3,
+                },
+            )
+
+        data = response.json()
+        self.assertEqual(data["slots"][0], "10:00")
+        self.assertEqual(len(data["slots"]), 20)
+        free = {master["id"]: master["free"] for master in data["masters"]}
+        self.assertEqual(free[self.master.id], ["ffffe", "fffff", "fffff"])
+        self.assertEqual(free[other.id], ["fffff", "fffff", "fffff"])
+
+
+class FirstAvailableTests(BookingDataMixin, TestCase):
+    def test_returns_soonest_slots_across_masters(self):
+        other = Master.objects.create(
+            name="Ольга", specialty="Визажист", experience="1 г.", order=1
+        )
+        other.salons.add(self.salon)
+        other.services.add(self.service)
+        for hour in range(10, 20):
+            self.book(time(hour, 0), appointment_date=date.today())
+            self.book(time(hour, 30), appointment_date=date.today())
+            self.book(time(hour, 0), master=other, appointment_date=date.today())
+            self.book(time(hour, 30), master=other, appointment_date=date.today())
+        self.book(time(10, 0))
+
+        self.warm_caches()
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                reverse("beauty_city_web:api_first_available"),
+                {"service_id": self.service.id, "limit": 3},
+            )
+
+        slots = [
+            (slot["date"], slot["time"], slot["master"]["id"])
+            for slot in response.json()["slots"]
+        ]
+        day = self.day.isoformat()
+        self.assertEqual(
+            slots,
+            [
+                (day, "10:00", other.id),
+                (day, "10:30", self.master.id),
+                (day, "10:30", other.id),
+            ],
+        )
+
+
+class SalonScheduleTests(BookingDataMixin, TestCase):
+    def admin_form(self, appointment_time, status="pending", instance=None):
+        return AppointmentAdminForm(
+            data={
+                "client": self.client_obj.pk,
+                "master": self.master.pk,
+                "service": self.service.pk,
+                "salon": self.salon.pk,
+                "appointment_date": self.day.isoformat(),
+                "appointment_time": appointment_time,
+                "status": status,
+            },
+            instance=instance,
+        )
+
+    def test_structured_hours_define_slots(self):
+        SalonWorkingHours.objects.create(
+            salon=self.salon,
+            weekday=self.day.weekday(),
+            opens_at=time(12, 0),
+            closes_at=time(23, 0),
+        )
+
+        times = self.get_times(salon_id=self.salon.id)
+
+        self.assertEqual(times[0], "12:00")
+        self.assertEqual(times[-1], "22:30")
+        self.assertTrue(self.admin_form("22:30").is_valid())
+        self.assertFalse(self.admin_form("10:00").is_valid())
+
+    def test_existing_appointment_survives_schedule_change(self):
+        appointment = self.book(time(12, 0))
+        SalonClosure.objects.create(salon=self.salon, date=self.day, reason="Праздник")
+
+        form = self.admin_form("12:00", status="cancelled", instance=appointment)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, "cancelled")
+
+        moved = self.admin_form("13:00", instance=appointment)
+        self.assertFalse(moved.is_valid())
+        self.assertIn("appointment_time", moved.errors)
+
+    def test_closure_removes_day(self):
+        self.get_times(salon_id=self.salon.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            SalonClosure.objects.create(
+                salon=self.salon, date=self.day, reason="Праздник"
+            )
+
+        self.assertEqual(self.get_times(salon_id=self.salon.id), [])
+        response = self.client.get(
+            reverse("beauty_city_web:api_available_dates_simple"),
+            {"salon_id": self.salon.id},
+        )
+        dates = [d["date"] for d in response.json()["dates"]]
+        self.assertNotIn(self.day.isoformat(), dates)
+
+
+class ServiceAvailableTimesTests(BookingDataMixin, TestCase):
+    def test_many_dates_in_one_query(self):
+        self.book(time(10, 0))
+        dates = [self.day + timedelta(days=i) for i in range(30)]
+
+        with self.assertNumQueries(1):
+            times = self.service.get_available_times_for_dates(
+                dates, master_id=self.master.id
+            )
+
+        self.assertEqual(times[self.day][0], "10:30")
+        self.assertEqual(times[dates[1]][0], "10:00")
+        self.assertEqual(
+            self.service.get_available_times(self.day, master_id=self.master.id),
+            times[self.day],
+        )
+
+
+class CreateAppointmentTests(BookingDataMixin, TestCase):
+    # Запросы успешной записи с удержанием и промокодом, включая чтение
+    # и сохранение сессии и точки сохранения транзакций теста
+    query_budget = 19
+
+    def post(self, appointment_time):
+        return self.client.post(
+            reverse("beauty_city_web:api_create_appointment"),
+            json.dumps(
+                {
+                    "phone": "+79990000000",
+                    "name": "Мария",
+                    "date": self.day.isoformat(),
+                    "time": appointment_time,
+                    "salon_id": self.salon.id,
+                    "service_id": self.service.id,
+                    "master_id": self.master.id,
+                }
+            ),
+            content_type="application/json",
+        )
+
+    def test_booking_fits_query_budget(self):
+        PromoCode.objects.create(
+            code="SALE",
+            discount_value=10,
+            description="Скидка 10%",
+            valid_from=timezone.now() - timedelta(days=1),
+            valid_to=timezone.now() + timedelta(days=1),
+        )
+        self.client.post(
+            reverse("beauty_city_web:api_save_appointment"),
+            json.dumps(
+                {
+                    "salon_id": self.salon.id,
+                    "service_id": self.service.id,
+                    "master_id": self.master.id,
+                    "date": self.day.isoformat(),
+                    "time": "12:00",
+                }
+            ),
+            content_type="application/json",
+        )
+        self.warm_caches()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("beauty_city_web:api_create_appointment"),
+                json.dumps(
+                    {"phone": "+79990000000", "name": "Мария", "promocode": "sale"}
+                ),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(queries), self.query_budget)
+        appointment = Appointment.objects.get()
+        self.assertEqual(appointment.final_price, 1260)
+        self.assertFalse(SlotHold.objects.exists())
+
+    def test_busy_slot_returns_conflict(self):
+        self.assertEqual(self.post("12:00").status_code, 200)
+
+        response = self.post("12:00")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["error_code"], "slot_unavailable")
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_conflict_does_not_touch_client(self):
+        other = Client.objects.create(name="Анна", phone="+79990000001")
+        Appointment.objects.create(
+            client=other,
+            master=self.master,
+            service=self.service,
+            salon=self.salon,
+            appointment_date=self.day,
+            appointment_time=time(12, 0),
+        )
+        Client.objects.create(name="Старое имя", phone="+79990000000")
+
+        self.assertEqual(self.post("12:00").status_code, 409)
+        self.assertEqual(Client.objects.get(phone="+79990000000").name, "Старое имя")
+
+        Client.objects.filter(phone="+79990000000").delete()
+        self.assertEqual(self.post("12:00").status_code, 409)
+        self.assertFalse(Client.objects.filter(phone="+79990000000").exists())
+
+    def test_closed_salon_is_rejected(self):
+        SalonClosure.objects.create(salon=self.salon, date=self.day, reason="Праздник")
+
+        response = self.post("12:00")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Appointment.objects.exists())
+
+
+class SlotHoldTests(BookingDataMixin, TestCase):
+    def pick(self, http, appointment_time="12:00"):
+        return http.post(
+            reverse("beauty_city_web:api_save_appointment"),
+            json.dumps(
+                {
+                    "salon_id": self.salon.id,
+                    "service_id": self.service.id,
+                    "master_id": self.master.id,
+                    "date": self.day.isoformat(),
+                    "time": appointment_time,
+                }
+            ),
+            content_type="application/json",
+        )
+
+    def confirm(self, http, phone):
+        return http.post(
+            reverse("beauty_city_web:api_create_appointment"),
+            json.dumps({"phone": phone, "name": "Мария"}),
+            content_type="application/json",
+        )
+
+    def test_held_slot_is_busy_for_others(self):
+        self.assertEqual(self.pick(self.client).status_code, 200)
+        self.assertNotIn("12:00", self.get_times(master_id=self.master.id))
+
+        other = HttpClient()
+        self.assertEqual(self.pick(other).status_code, 409)
+        self.assertEqual(self.pick(other, "12:30").status_code, 200)
+
+    def test_hold_is_promoted_on_confirm(self):
+        self.pick(self.client)
+        other = HttpClient()
+        other.post(
+            reverse("beauty_city_web:api_save_appointment"),
+            json.dumps({"date": self.day.isoformat(), "time": "12:00"}),
+            content_type="application/json",
+        )
+        self.assertEqual(self.confirm(other, "+79990000001").status_code, 409)
+
+        response = self.confirm(self.client, "+79990000000")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(SlotHold.objects.exists())
+        self.assertTrue(Appointment.objects.filter(appointment_time=time(12)).exists())
+
+    def test_expired_holds_are_swept(self):
+        self.pick(self.client)
+        SlotHold.objects.update(expires_at=timezone.now())
+
+        self.assertEqual(expire_holds(), 1)
+        self.assertFalse(MasterDayAvailability.objects.exists())
+        self.assertIn("12:00", self.get_times(master_id=self.master.id))
+
+    def test_expired_hold_is_released_on_read(self):
+        self.pick(self.client)
+        self.assertNotIn("12:00", self.get_times(master_id=self.master.id))
+        SlotHold.objects.update(expires_at=timezone.now())
+        cache.delete("slot_holds:next_expiry")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.get_times(master_id=self.master.id)
+
+        self.assertFalse(SlotHold.objects.exists())
+        self.assertIn("12:00", self.get_times(master_id=self.master.id))
+
+    def test_hold_is_validated_like_booking(self):
+        other_salon = Salon.objects.create(name="Другой", address="ул. Мира, 2")
+        response = self.client.post(
+            reverse("beauty_city_web:api_save_appointment"),
+            json.dumps(
+                {
+                    "salon_id": other_salon.id,
+                    "service_id": self.service.id,
+                    "master_id": self.master.id,
+                    "date": self.day.isoformat(),
+                    "time": "12:00",
+                }
+            ),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        self.assertEqual(self.pick(self.client, "21:00").status_code, 400)
+        self.assertFalse(SlotHold.objects.exists())
+
+
+class ImportBookingsTests(BookingDataMixin, TestCase):
+    def run_import(self, content, suffix):
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=suffix, encoding="utf-8", delete=False
+        ) as export:
+            export.write(content)
+        self.addCleanup(os.remove, export.name)
+        out, err = StringIO(), StringIO()
+        call_command(
+            "import_bookings", export.name, batch_size=2, stdout=out, stderr=err
+        )
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_import_upserts_clients_and_validates_slots(self):
+        past = date.today() - timedelta(days=30)
+        ids = f"{self.master.id},{self.salon.id},{self.service.id}"
+        out, err = self.run_import(
+            "phone,name,email,date,time,master_id,salon_id,service_id\n"
+            f"8 (999) 123-45-67,Анна Петрова,,{past},11:00,{ids}\n"
+            f"+79990000001,Ольга,olga@example.com,{self.day},12:00,{ids}\n"
+            "12345,Ира,,,,,,\n"
+            f"+79990000002,Вера,,{self.day},21:00,{ids}\n"
+            "+79990000003,Нина,,,,,,\n",
+            ".csv",
+        )
+
+        self.client_obj.refresh_from_db()
+        self.assertEqual(self.client_obj.name, "Анна Петрова")
+        self.assertEqual(Client.objects.count(), 4)
+        self.assertEqual(
+            Appointment.objects.get(appointment_date=past).status, "completed"
+        )
+        self.assertTrue(
+            MasterDayAvailability.objects.filter(
+                master=self.master, date=self.day
+            ).exists()
+        )
+        self.assertIn("Строка 4: Неверный номер телефона", err)
+        self.assertIn("Строка 5: Салон не принимает записи на это время", err)
+        self.assertIn("записей создано 2", out)
+
+    def test_jsonl_import_skips_taken_slots(self):
+        self.book(time(12, 0))
+        row = {
+            "phone": "+79990000001",
+            "name": "Ольга",
+            "date": self.day.isoformat(),
+            "time": "12:00",
+            "master_id": self.master.id,
+            "salon_id": self.salon.id,
+            "service_id": self.service.id,
+        }
+
+        out, err = self.run_import(json.dumps(row) + "\n", ".jsonl")
+
+        self.assertIn("Строка 1: Время мастера уже занято", err)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_live_holds_and_foreign_salons_are_rejected(self):
+        SlotHold.objects.create(
+            master=self.master,
+            salon=self.salon,
+            service=self.service,
+            appointment_date=self.day,
+            appointment_time=time(12, 0),
+            session_key="held",
+            expires_at=timezone.now() + timedelta(minutes=10),
+        )
+        other_salon = Salon.objects.create(name="Другой", address="ул. Мира, 2")
+        out, err = self.run_import(
+            "phone,name,date,time,master_id,salon_id,service_id\n"
+            f"+79990000001,Ольга,{self.day},12:00,"
+            f"{self.master.id},{self.salon.id},{self.service.id}\n"
+            f"+79990000002,Вера,{self.day},13:00,"
+            f"{self.master.id},{other_salon.id},{self.service.id}\n",
+            ".csv",
+        )
+
+        self.assertIn("Строка 2: Время мастера уже занято", err)
+        self.assertIn(
+            f"Строка 3: Мастер {self.master.id} не работает в салоне {other_salon.id}",
+            err,
+        )
+        self.assertFalse(Appointment.objects.exists())
+
+    def test_long_services_do_not_overlap(self):
+        coloring = Service.objects.create(
+            name="Окрашивание волос", category=self.category, price=5000, duration=120
+        )
+        self.master.services.add(coloring)
+        self.book(time(15, 0), service=coloring)
+        ids = f"{self.master.id},{self.salon.id}"
+        out, err = self.run_import(
+            "phone,name,date,time,master_id,salon_id,service_id\n"
+            f"+79990000001,Ольга,{self.day},10:00,{ids},{coloring.id}\n"
+            f"+79990000002,Вера,{self.day},11:00,{ids},{self.service.id}\n"
+            f"+79990000003,Нина,{self.day},12:00,{ids},{self.service.id}\n"
+            f"+79990000004,Ирина,{self.day},16:30,{ids},{self.service.id}\n",
+            ".csv",
+        )
+
+        self.assertIn("Строка 3: Время мастера уже занято", err)
+        self.assertIn("Строка 5: Время мастера уже занято", err)
+        self.assertEqual(
+            sorted(Appointment.objects.values_list("appointment_time", flat=True)),
+            [time(10, 0), time(12, 0), time(15, 0)],
+        )
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        caches["idempotency"].clear()
+
+    def post(self, key, phone="+79991234567", remote_addr="127.0.0.1"):
+        return self.client.post(
+            reverse("beauty_city_web:api_contact_request"),
+            json.dumps({"name": "Анна", "phone": phone, "terms_agreed": True}),
+            content_type="application/json",
+            headers={"Idempotency-Key": key},
+            REMOTE_ADDR=remote_addr,
+        )
+
+    def test_retry_replays_stored_response(self):
+        first = self.post("retry-1")
+        retry = self.post("retry-1")
+
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Consultation.objects.count(), 1)
+
+        self.post("retry-2")
+        self.assertEqual(Consultation.objects.count(), 2)
+
+    def test_key_reused_with_other_body_is_rejected(self):
+        self.post("retry-1")
+
+        response = self.post("retry-1", phone="+79990000000")
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Consultation.objects.count(), 1)
+
+    def test_key_is_not_replayed_to_other_client(self):
+        self.post("retry-1")
+
+        response = self.post("retry-1", remote_addr="10.0.0.2")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(Consultation.objects.count(), 2)
+
+
+# Запросы на сборку снимка каталога, не зависят от числа объектов
+CATALOG_QUERIES = 6
+
+
+class ApiMastersTests(BookingDataMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for i in range(5):
+            master = Master.objects.create(
+                name=f"Мастер {i}", specialty="Стилист", experience="1 г.", order=1
+            )
+            master.salons.add(cls.salon)
+            master.services.add(cls.service)
+
+    def get_masters(self, **params):
+        response = self.client.get(reverse("beauty_city_web:api_masters"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_depend_on_masters(self):
+        with self.assertNumQueries(CATALOG_QUERIES):
+            data = self.get_masters(salon_id=self.salon.id)
+        with self.assertNumQueries(0):
+            self.get_masters(service_id=self.service.id)
+
+        self.assertEqual(len(data["masters"]), 6)
+        self.assertEqual(
+            data["masters"][0]["salons"],
+            [{"id": self.salon.id, "name": "BeautyCity", "address": "ул. Ленина, 1"}],
+        )
+        self.assertEqual(
+            data["masters"][0]["services"],
+            [{"id": self.service.id, "name": "Дневной макияж", "price": 1400.0}],
+        )
+
+    def test_inactive_relations_are_hidden(self):
+        self.service.is_active = False
+        self.service.save()
+
+        with self.assertNumQueries(CATALOG_QUERIES):
+            data = self.get_masters()
+
+        self.assertEqual(data["masters"][0]["services"], [])
+
+    def test_pagination(self):
+        with self.assertNumQueries(CATALOG_QUERIES):
+            data = self.get_masters(page=2, page_size=4)
+
+        self.assertEqual(len(data["masters"]), 2)
+        self.assertEqual(
+            data["pagination"], {"page": 2, "page_size": 4, "pages": 2, "total": 6}
+        )
+
+
+class ApiServicesTests(BookingDataMixin, TestCase):
+    def get_tree(self, **params):
+        response = self.client.get(reverse("beauty_city_web:api_services"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["categories"]
+
+    def test_tree_is_ordered_and_cached(self):
+        first = ServiceCategory.objects.create(name="Макияж", order=0)
+        for order, name in ((2, "Свадебный макияж"), (1, "Вечерний макияж")):
+            service = Service.objects.create(
+                name=name, category=first, price=2000, duration=60, order=order
+            )
+            self.master.services.add(service)
+
+        with self.assertNumQueries(CATALOG_QUERIES):
+            tree = self.get_tree(salon_id=self.salon.id, master_id="any")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_tree(salon_id=self.salon.id), tree)
+
+        # Одноименные категории не сливаются
+        self.assertEqual([c["id"] for c in tree], [first.id, self.category.id])
+        self.assertEqual(
+            [s["name"] for s in tree[0]["services"]],
+            ["Вечерний макияж", "Свадебный макияж"],
+        )
+
+    def test_cache_is_invalidated_by_master_services(self):
+        service = Service.objects.create(
+            name="Укладка", category=self.category, price=1500, duration=60
+        )
+        self.assertEqual(len(self.get_tree(master_id=self.master.id)[0]["services"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.master.services.add(service)
+
+        self.assertEqual(len(self.get_tree(master_id=self.master.id)[0]["services"]), 2)
+
+        self.category.name = "Прически"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+
+        self.assertEqual(self.get_tree(master_id=self.master.id)[0]["name"], "Прически")
+
+
+class CatalogSnapshotTests(BookingDataMixin, TestCase):
+    def get_catalog(self, **headers):
+        return self.client.get(reverse("beauty_city_web:api_catalog"), headers=headers)
+
+    def test_snapshot_contents(self):
+        data = self.get_catalog().json()
+
+        self.assertEqual([salon["id"] for salon in data["salons"]], [self.salon.id])
+        self.assertEqual(data["services"][0]["category_id"], self.category.id)
+        self.assertEqual(data["masters"][0]["salon_ids"], [self.salon.id])
+        self.assertEqual(data["masters"][0]["service_ids"], [self.service.id])
+
+    def test_revisit_gets_not_modified(self):
+        etag = self.get_catalog()["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get_catalog(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.salon.name = "BeautyCity Центр"
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.salon.save()
+
+        # До фиксации транзакции отдается прежний снимок
+        self.assertEqual(self.get_catalog(if_none_match=etag).status_code, 304)
+        for callback in callbacks:
+            callback()
+
+        response = self.get_catalog(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command("rebuild_catalog", stdout=out)
+
+        self.assertIn("мастеров 1", out.getvalue())
+        with self.assertNumQueries(0):
+            self.get_catalog()
+
+
+class CompatibilityIndexTests(BookingDataMixin, TestCase):
+    def check(self, salon):
+        response = self.client.get(
+            reverse("beauty_city_web:api_check_master_salon_compatibility"),
+            {"master_id": self.master.id, "salon_id": salon.id},
+        )
+        return response.json()["compatible"]
+
+    def test_compatibility_is_answered_from_index(self):
+        other = Salon.objects.create(name="BeautyCity 2", address="ул. Мира, 5")
+        self.assertTrue(self.check(self.salon))
+
+        with self.assertNumQueries(0):
+            self.assertFalse(self.check(other))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.master.salons.add(other)
+        self.assertTrue(self.check(other))
+
+    def test_matrix_endpoint(self):
+        response = self.client.get(reverse("beauty_city_web:api_compatibility"))
+        matrix = response.json()
+
+        self.assertEqual(
+            matrix["master_salons"], {str(self.master.id): [self.salon.id]}
+        )
+        self.assertEqual(
+            matrix["salon_services"], {str(self.salon.id): [self.service.id]}
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse("beauty_city_web:api_compatibility"),
+                headers={"if_none_match": response["ETag"]},
+            ).status_code,
+            304,
+        )
+
+
+class ConditionalRequestTests(BookingDataMixin, TestCase):
+    def get(self, name, params=None, **headers):
+        return self.client.get(
+            reverse(f"beauty_city_web:{name}"), params, headers=headers
+        )
+
+    def test_catalog_endpoints_are_cached_long(self):
+        response = self.get("api_salons")
+
+        self.assertIn("max-age=300", response["Cache-Control"])
+        self.assertIn("stale-while-revalidate=86400", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            revisit = self.get("api_salons", if_none_match=response["ETag"])
+        self.assertEqual(revisit.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.master.salons.clear()
+        self.assertEqual(
+            self.get("api_salons", if_none_match=response["ETag"]).status_code, 200
+        )
+
+    def test_availability_changes_with_bookings(self):
+        params = {"date": self.day.isoformat(), "master_id": self.master.id}
+        response = self.get("api_available_times", params)
+
+        self.assertIn("max-age=5", response["Cache-Control"])
+        self.assertIn("stale-while-revalidate=30", response["Cache-Control"])
+        self.assertEqual(
+            self.get(
+                "api_available_times",
+                params,
+                if_modified_since=response["Last-Modified"],
+            ).status_code,
+            304,
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(time(12, 0))
+
+        revisit = self.get(
+            "api_available_times", params, if_none_match=response["ETag"]
+        )
+        self.assertEqual(revisit.status_code, 200)
+        self.assertNotEqual(revisit["ETag"], response["ETag"])
+
+    def test_errors_are_not_cached(self):
+        response = self.get("api_available_times")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.has_header("ETag"))
+
+
+class IndexPageTests(BookingDataMixin, TestCase):
+    # Салоны, услуги, мастера с числом отзывов и отзывы с клиентами
+    query_budget = 4
+
+    def add_reviews(self, count):
+        clients = Client.objects.bulk_create(
+            Client(name=f"Клиент {i}", phone=f"+7999000{i:04d}") for i in range(count)
+        )
+        Review.objects.bulk_create(
+            Review(
+                client=client,
+                master=self.master,
+                text="Отлично",
+                date=date.today() - timedelta(days=i),
+            )
+            for i, client in enumerate(clients)
+        )
+        # bulk_create обходит сигналы
+        recompute_master_ratings()
+
+    def get_uncached(self):
+        cache.clear()
+        return self.client.get(reverse("beauty_city_web:index"))
+
+    def test_query_count_does_not_grow_with_reviews(self):
+        self.add_reviews(3)
+        with self.assertNumQueries(self.query_budget):
+            self.get_uncached()
+
+        self.add_reviews(INDEX_REVIEWS_LIMIT * 2)
+        other = Master.objects.create(
+            name="Ольга", specialty="Стилист", experience="1 г."
+        )
+        with self.assertNumQueries(self.query_budget):
+            response = self.get_uncached()
+
+        reviews = list(response.context["reviews"])
+        self.assertEqual(len(reviews), INDEX_REVIEWS_LIMIT)
+        self.assertEqual(reviews[0].date, date.today())
+        masters = {master.id: master for master in response.context["masters"]}
+        self.assertEqual(
+            masters[self.master.id].review_count, 3 + INDEX_REVIEWS_LIMIT * 2
+        )
+        self.assertEqual(masters[other.id].review_count, 0)
+
+    def test_inactive_services_are_hidden(self):
+        Service.objects.create(
+            name="Архив", category=self.category, price=1, duration=30, is_active=False
+        )
+
+        response = self.client.get(reverse("beauty_city_web:index"))
+
+        self.assertEqual(list(response.context["services"]), [self.service])
+
+
+class PageCacheTests(BookingDataMixin, TestCase):
+    def get(self):
+        return self.client.get(reverse("beauty_city_web:index"))
+
+    def test_anonymous_page_is_served_from_cache(self):
+        first = self.get()
+        with self.assertNumQueries(0):
+            second = self.get()
+
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(get_cache_stats("page")["hits"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                client=self.client_obj, master=self.master, text="Новый", date=self.day
+            )
+        # Салоны и услуги берутся из кэша разделов
+        with self.assertNumQueries(2):
+            third = self.get()
+        self.assertContains(third, "Новый")
+        self.assertContains(third, "Отзывов: 1")
+
+        out = StringIO()
+        call_command("cache_stats", "page", stdout=out)
+        self.assertIn("попаданий 1, промахов 2", out.getvalue())
+
+    def test_client_rename_refreshes_reviews(self):
+        Review.objects.create(
+            client=self.client_obj, master=self.master, text="Хорошо", date=self.day
+        )
+        self.get()
+
+        self.client_obj.name = "Мария"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_obj.save()
+
+        self.assertContains(self.get(), "Мария")
+
+    def test_staff_bypasses_cache(self):
+        staff = get_user_model().objects.create_user("admin", is_staff=True)
+        self.get()
+        self.client.force_login(staff)
+        Service.objects.filter(pk=self.service.pk).update(name="Вечерний макияж")
+
+        response = self.get()
+
+        self.assertContains(response, "Вечерний макияж")
+        self.assertEqual(get_cache_stats("fragment")["hits"], 0)
+
+
+class MasterRatingTests(BookingDataMixin, TestCase):
+    def review(self, rating, master=None):
+        return Review.objects.create(
+            client=self.client_obj,
+            master=master or self.master,
+            text="Отзыв",
+            date=self.day,
+            rating=rating,
+        )
+
+    def assertStats(self, master, count, rating):
+        master.refresh_from_db()
+        self.assertEqual(master.review_count, count)
+        self.assertAlmostEqual(master.avg_rating, rating)
+
+    def test_stats_follow_review_changes(self):
+        self.review(5)
+        review = self.review(3)
+        self.assertStats(self.master, 2, 4)
+
+        review.rating = 4
+        review.save()
+        self.assertStats(self.master, 2, 4.5)
+
+        other = Master.objects.create(
+            name="Ольга", specialty="Стилист", experience="1 г."
+        )
+        review.master = other
+        review.save()
+        self.assertStats(self.master, 1, 5)
+        self.assertStats(other, 1, 4)
+
+        review.delete()
+        self.assertStats(other, 0, 0)
+
+    def test_recompute_command(self):
+        Review.objects.bulk_create(
+            Review(
+                client=self.client_obj,
+                master=self.master,
+                text="Отзыв",
+                date=self.day,
+                rating=rating,
+            )
+            for rating in (5, 4, 3)
+        )
+        Master.objects.filter(pk=self.master.pk).update(avg_rating=1)
+
+        with self.assertNumQueries(1):
+            recompute_master_ratings()
+        self.assertStats(self.master, 3, 4)
+
+        call_command("recompute_master_ratings", stdout=StringIO())
+        self.assertStats(self.master, 3, 4)
+
+    def test_masters_api_sorts_by_rating(self):
+        other = Master.objects.create(
+            name="Ольга", specialty="Стилист", experience="1 г."
+        )
+        other.salons.add(self.salon)
+        self.review(5, master=other)
+        self.review(3)
+
+        response = self.client.get(
+            reverse("beauty_city_web:api_masters"), {"sort": "rating"}
+        )
+
+        masters = response.json()["masters"]
+        self.assertEqual([m["id"] for m in masters], [other.id, self.master.id])
+        self.assertEqual(masters[0]["rating"], 5)
+        self.assertEqual(masters[0]["review_count"], 1)
+
+
+@override_settings(IMAGE_VARIANTS_BACKGROUND=False)
+class PhotoVariantsTests(BookingDataMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def upload(self, instance, size, color="red"):
+        buffer = BytesIO()
+        Image.new("RGB", size, color).save(buffer, "PNG")
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.photo = SimpleUploadedFile("photo.png", buffer.getvalue())
+            instance.save()
+        instance.refresh_from_db()
+        return instance.photo_variants
+
+    def test_variants_are_resized_webp_with_hashed_names(self):
+        variants = self.upload(self.master, (2000, 1000))
+
+        self.assertEqual(variants["source"], self.master.photo.name)
+        self.assertEqual(list(variants["widths"]), ["320", "640", "1280"])
+        for width, name in variants["widths"].items():
+            self.assertRegex(name, rf"^variants/masters/[0-9a-f]{{16}}-{width}w\.webp$")
+            with Image.open(self.master.photo.storage.open(name)) as image:
+                self.assertEqual(image.format, "WEBP")
+                self.assertEqual(image.size, (int(width), int(width) // 2))
+
+        masters = self.client.get(reverse("beauty_city_web:api_masters")).json()
+        srcset = masters["masters"][0]["photo_srcset"]
+        self.assertTrue(srcset["640"].endswith(variants["widths"]["640"]))
+
+    def test_small_photo_is_not_upscaled(self):
+        variants = self.upload(self.salon, (200, 100))
+
+        self.assertEqual(list(variants["widths"]), ["200"])
+
+    def test_new_photo_gets_new_variants(self):
+        first = self.upload(self.service, (800, 800))
+        second = self.upload(self.service, (800, 800), color="blue")
+
+        self.assertNotEqual(first["widths"]["640"], second["widths"]["640"])
+        tree = self.client.get(reverse("beauty_city_web:api_services")).json()
+        service = tree["categories"][0]["services"][0]
+        self.assertTrue(
+            service["photo_srcset"]["640"].endswith(second["widths"]["640"])
+        )
+
+    def test_command_fills_missing_variants(self):
+        self.upload(self.master, (1000, 1000))
+        Master.objects.filter(pk=self.master.pk).update(photo_variants={})
+
+        call_command("generate_image_variants", stdout=StringIO())
+
+        self.master.refresh_from_db()
+        self.assertEqual(len(self.master.photo_variants["widths"]), 3)
+
+
+class ClientStatisticsTests(BookingDataMixin, TestCase):
+    def register(self, name, phone, days_ago):
+        client = Client.objects.create(name=name, phone=phone)
+        Client.objects.filter(pk=client.pk).update(
+            registration_date=timezone.now() - timedelta(days=days_ago)
+        )
+        return client
+
+    def get(self, **params):
+        return self.client.get(
+            reverse("beauty_city_web:api_client_statistics"), params
+        ).json()
+
+    def test_statistics_in_one_cached_query(self):
+        self.register("Борис", "+79991230001", 3)
+        old = self.register("Вера", "+79991230002", 40)
+        self.book(time(12, 0), client=old)
+
+        with self.assertNumQueries(1):
+            stats = self.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(), stats)
+
+        self.assertEqual(stats["total_clients"], 3)
+        self.assertEqual(stats["today_registrations"], 1)
+        self.assertEqual(stats["weekly_registrations"], 2)
+        self.assertEqual(stats["active_clients"], 1)
+        today = timezone.localdate()
+        self.assertEqual(
+            stats["daily_stats"],
+            [
+                {"day": (today - timedelta(days=3)).isoformat(), "count": 1},
+                {"day": today.isoformat(), "count": 1},
+            ],
+        )
+
+    def test_period_limits_total_and_daily_stats(self):
+        self.register("Борис", "+79991230001", 3)
+
+        stats = self.get(period="today")
+
+        self.assertEqual(stats["total_clients"], 1)
+        self.assertEqual(stats["weekly_registrations"], 2)
+        self.assertEqual(len(stats["daily_stats"]), 1)
+        self.assertEqual(stats["period"], "today")
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """Параллельные записи на один слот: побеждает ровно одна"""
+
+    threads = 200
+
+    def setUp(self):
+        cache.clear()
+        self.salon = Salon.objects.create(name="BeautyCity", address="ул. Ленина, 1")
+        self.service = Service.objects.create(
+            name="Дневной макияж",
+            category=ServiceCategory.objects.create(name="Макияж"),
+            price=1400,
+            duration=30,
+        )
+        self.master = Master.objects.create(
+            name="Ева Колесова", specialty="Визажист", experience="2 г."
+        )
+        self.clients = [
+            Client.objects.create(name=f"Клиент {i}", phone=f"+7999{i:07d}")
+            for i in range(self.threads)
+        ]
+        self.day = date.today() + timedelta(days=1)
+
+    def test_single_winner_under_contention(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("потокам нужна общая база на диске")
+        barrier = threading.Barrier(self.threads)
+        winners, conflicts, errors = [], [], []
+
+        def attempt(client):
+            try:
+                barrier.wait()
+                winners.append(
+                    book_appointment(
+                        client=client,
+                        master=self.master,
+                        service=self.service,
+                        salon=self.salon,
+                        appointment_date=self.day,
+                        appointment_time=time(12, 0),
+                    )
+                )
+            except SlotUnavailableError:
+                conflicts.append(client)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [
+            threading.Thread(target=attempt, args=(client,)) for client in self.clients
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(winners), 1)
+        self.assertEqual(len(conflicts), self.threads - 1)
+        self.assertEqual(
+            Appointment.objects.filter(
+                master=self.master, appointment_date=self.day
+            ).count(),
+            1,
+        )
@@ -11,15 +11,25 @@ urlpatterns = [
     path("service/", views.service, name="service"),
     path("service-finally/", views.service_finally, name="service_finally"),
     # API маршруты (для фронтенда)
+    path("api/catalog/", views.api_catalog, name="api_catalog"),
     path("api/salons/", views.api_salons, name="api_salons"),
     path("api/services/", views.api_services, name="api_services"),
     path("api/masters/", views.api_masters, name="api_masters"),
+    path(
+        "api/available-dates/", views.api_available_dates, name="api_available_dates"
+    ),
     path(
         "api/available-dates-simple/",
         views.api_available_dates_simple,
         name="api_available_dates_simple",
     ),
     path("api/available-times/", views.api_available_times, name="api_available_times"),
+    path(
+        "api/availability-grid/",
+        views.api_availability_grid,
+        name="api_availability_grid",
+    ),
+    path("api/first-available/", views.api_first_available, name="api_first_available"),
     path(
         "api/save-appointment/", views.api_save_appointment, name="api_save_appointment"
     ),
@@ -45,5 +55,10 @@ urlpatterns = [
         views.api_check_master_salon_compatibility,
         name="api_check_master_salon_compatibility",
     ),
+    path(
+        "api/compatibility/",
+        views.api_compatibility,
+        name="api_compatibility",
+    ),
     path("admin-page/", views.admin_page, name="admin_page"),
 ]
@@ -0,0 +1,672 @@
+"""Расчет свободных слотов для записи"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import time, timedelta
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Min, TimeField, Value
+from django.utils import timezone
+
+from ..models import (
+    Appointment,
+    MasterDayAvailability,
+    SalonClosure,
+    SalonWorkingHours,
+    Service,
+    SlotHold,
+)
+from .cache import bump_version, get_or_build, touch_stamp
+
+# Занятость дня хранится битовой маской: бит i соответствует слоту,
+# который начинается через i * SLOT_MINUTES минут после полуночи
+SLOT_MINUTES = 30
+
+# Горизонт записи в днях: по умолчанию и максимально допустимый
+DEFAULT_HORIZON_DAYS = 30
+MAX_HORIZON_DAYS = 90
+
+# Статусы записей, которые занимают время мастера
+ACTIVE_STATUSES = ("pending", "confirmed")
+
+# Часы работы салона, для которого не задано расписание
+DEFAULT_OPENS_AT = time(10, 0)
+DEFAULT_CLOSES_AT = time(20, 0)
+
+# Границы периодов дня для группировки времени
+PERIODS = (
+    ("Утро", time(12, 0)),
+    ("День", time(17, 0)),
+    ("Вечер", None),
+)
+
+
+def minutes_of(value):
+    """Время в минутах от полуночи"""
+    return value.hour * 60 + value.minute
+
+
+def slot_index(value):
+    """Номер получасового слота, в который попадает время"""
+    return (value.hour * 60 + value.minute) // SLOT_MINUTES
+
+
+def slot_time(index):
+    """Время начала слота по его номеру"""
+    minutes = index * SLOT_MINUTES
+    return time(minutes // 60, minutes % 60)
+
+
+def hours_mask(opens_at, closes_at):
+    """Маска слотов, целиком попадающих в часы работы"""
+    first = -(-minutes_of(opens_at) // SLOT_MINUTES)
+    last = minutes_of(closes_at) // SLOT_MINUTES
+    if last <= first:
+        return 0
+    return (1 << last) - (1 << first)
+
+
+WORKING_MASK = hours_mask(DEFAULT_OPENS_AT, DEFAULT_CLOSES_AT)
+
+
+def iter_slots(mask):
+    """Номера установленных битов маски по возрастанию"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DaySchedule:
+    """Занятые интервалы мастера за день.
+
+    Интервалы хранятся отсортированными и объединенными, поэтому
+    проверка пересечения выполняется бинарным поиском за O(log n).
+    Границы интервалов заданы в минутах от полуночи, конец не включается.
+    """
+
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    @classmethod
+    def from_appointments(cls, rows):
+        """Расписание по парам (время начала, длительность в минутах)"""
+        intervals = []
+        for start_time, duration in rows:
+            start = minutes_of(start_time)
+            intervals.append((start, start + (duration or SLOT_MINUTES)))
+        return cls(intervals)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def overlaps(self, start, end):
+        """Пересекается ли интервал [start, end) с занятым временем"""
+        index = bisect_right(self.ends, start)
+        return index < len(self.starts) and self.starts[index] < end
+
+    def is_free(self, start_time, duration):
+        """Свободно ли время для услуги указанной длительности"""
+        start = minutes_of(start_time)
+        return not self.overlaps(start, start + duration)
+
+    def add(self, start_time, duration):
+        """Занять время услуги, соседние интервалы объединяются"""
+        start = minutes_of(start_time)
+        end = start + (duration or SLOT_MINUTES)
+        first = bisect_left(self.ends, start)
+        last = bisect_right(self.starts, end)
+        if first < last:
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    def busy_mask(self, duration=SLOT_MINUTES):
+        """Маска слотов, с которых услуга длительностью duration
+        пересеклась бы с занятым временем"""
+        mask = 0
+        for start, end in zip(self.starts, self.ends):
+            first = max(0, (start - duration) // SLOT_MINUTES + 1)
+            last = (end - 1) // SLOT_MINUTES
+            mask |= ((1 << (last + 1)) - 1) & ~((1 << first) - 1)
+        return mask
+
+
+def fit_mask(mask, duration):
+    """Слоты маски, начав с которых услуга длительностью duration
+    целиком проходит по слотам маски"""
+    fitted = mask
+    for shift in range(1, -(-duration // SLOT_MINUTES)):
+        fitted &= mask >> shift
+    return fitted
+
+
+def expand_busy_mask(busy_mask, duration):
+    """Маска слотов, с которых услуга длительностью duration
+    задела бы занятые слоты"""
+    mask = busy_mask
+    for shift in range(1, -(-duration // SLOT_MINUTES)):
+        mask |= busy_mask >> shift
+    return mask
+
+
+def closing_mask(duration, working_mask=WORKING_MASK):
+    """Рабочие слоты, с которых услуга длительностью duration
+    не успеет закончиться до закрытия"""
+    return working_mask & ~fit_mask(working_mask, duration)
+
+
+def free_slots(busy_mask, working_mask=WORKING_MASK):
+    """Свободные слоты рабочего дня"""
+    return [slot_time(index) for index in iter_slots(working_mask & ~busy_mask)]
+
+
+def get_salon_schedule(salon_id):
+    """Скомпилированное расписание салона.
+
+    Возвращает маски рабочих слотов по дням недели (понедельник — 0)
+    и множество дат, когда салон закрыт. Расписание строится двумя
+    запросами и хранится в кэше до изменения часов работы или выходных.
+    """
+    if not salon_id:
+        return {"weekdays": [WORKING_MASK] * 7, "closures": frozenset()}
+
+    def build():
+        hours = SalonWorkingHours.objects.filter(salon_id=salon_id).values_list(
+            "weekday", "opens_at", "closes_at"
+        )
+        weekdays = [0] * 7
+        has_hours = False
+        for weekday, opens_at, closes_at in hours:
+            weekdays[weekday] |= hours_mask(opens_at, closes_at)
+            has_hours = True
+
+        closures = SalonClosure.objects.filter(
+            salon_id=salon_id, date__gte=timezone.localdate()
+        ).values_list("date", flat=True)
+
+        return {
+            "weekdays": weekdays if has_hours else [WORKING_MASK] * 7,
+            "closures": frozenset(closures),
+        }
+
+    return get_or_build(
+        "salon_schedule", (salon_id,), [("salon_schedule", salon_id)], build
+    )
+
+
+def working_mask(salon_id, date):
+    """Рабочие слоты салона на дату, без салона — часы по умолчанию"""
+    schedule = get_salon_schedule(salon_id)
+    if date in schedule["closures"]:
+        return 0
+    return schedule["weekdays"][date.weekday()]
+
+
+def all_working_mask():
+    """Слоты, в которые работает хотя бы один салон"""
+    mask = WORKING_MASK
+    for opens_at, closes_at in SalonWorkingHours.objects.values_list(
+        "opens_at", "closes_at"
+    ):
+        mask |= hours_mask(opens_at, closes_at)
+    return mask
+
+
+def is_working_slot(salon_id, date, value, duration=SLOT_MINUTES):
+    """Успеет ли услуга, начатая в это время, пройти в часы работы салона"""
+    mask = fit_mask(working_mask(salon_id, date), duration)
+    return bool(mask >> slot_index(value) & 1)
+
+
+def earliest_start(now=None):
+    """Самое раннее время, на которое еще можно записаться: через час"""
+    return timezone.localtime(now) + timedelta(hours=1)
+
+
+def bookable_mask(date, earliest, duration=SLOT_MINUTES, working=WORKING_MASK):
+    """Рабочие слоты даты, которые начинаются позже earliest и в которые
+    услуга длительностью duration успевает закончиться до закрытия"""
+    working = fit_mask(working, duration)
+    if date > earliest.date():
+        return working
+    if date < earliest.date():
+        return 0
+
+    first = (earliest.hour * 60 + earliest.minute) // SLOT_MINUTES + 1
+    return working & ~((1 << first) - 1)
+
+
+def active_appointments():
+    """Записи, которые занимают время мастера"""
+    return Appointment.objects.filter(status__in=ACTIVE_STATUSES).order_by()
+
+
+def active_holds(now=None):
+    """Удержания слотов, срок которых еще не истек"""
+    return SlotHold.objects.filter(expires_at__gt=now or timezone.now()).order_by()
+
+
+def occupied(fields, **filters):
+    """Строки fields активных записей и удержаний одним запросом"""
+    return (
+        active_appointments()
+        .filter(**filters)
+        .values_list(*fields)
+        .union(active_holds().filter(**filters).values_list(*fields), all=True)
+        .order_by()
+    )
+
+
+def group_schedules(rows):
+    """Расписания по датам из строк (дата, время начала, длительность)"""
+    intervals = {}
+    for appointment_date, start_time, duration in rows:
+        intervals.setdefault(appointment_date, []).append((start_time, duration))
+    return {
+        appointment_date: DaySchedule.from_appointments(day_rows)
+        for appointment_date, day_rows in intervals.items()
+    }
+
+
+def get_day_schedule(master_id, date, exclude_pk=None, hold_key=None):
+    """Расписание мастера на день с удержаниями одним запросом.
+
+    exclude_pk исключает переносимую запись, hold_key - удержания
+    сессии, которая оформляет запись.
+    """
+    fields = ("appointment_time", "service__duration")
+    appointments = active_appointments().filter(
+        master_id=master_id, appointment_date=date
+    )
+    if exclude_pk:
+        appointments = appointments.exclude(pk=exclude_pk)
+    holds = active_holds().filter(master_id=master_id, appointment_date=date)
+    if hold_key:
+        holds = holds.exclude(session_key=hold_key)
+    return DaySchedule.from_appointments(
+        appointments.values_list(*fields)
+        .union(holds.values_list(*fields), all=True)
+        .order_by()
+    )
+
+
+def is_slot_free(master_id, date, start_time, duration, exclude_pk=None, hold_key=None):
+    """Свободно ли у мастера время для услуги указанной длительности"""
+    schedule = get_day_schedule(
+        master_id, date, exclude_pk=exclude_pk, hold_key=hold_key
+    )
+    return schedule.is_free(start_time, duration or SLOT_MINUTES)
+
+
+def _with_service_duration(rows, service_id, output_field):
+    """Добавить к запросу строку (None, длительность услуги).
+
+    Длительность выбранной услуги читается тем же запросом, что и
+    занятость, первая колонка ее строки пустая.
+    """
+    if not service_id:
+        return rows
+    return rows.union(
+        Service.objects.filter(id=service_id)
+        .order_by()
+        .annotate(empty=Value(None, output_field=output_field))
+        .values_list("empty", "duration"),
+        all=True,
+    ).order_by()
+
+
+def _split_service_duration(rows):
+    """Отделить строку длительности услуги от остальных строк"""
+    duration = SLOT_MINUTES
+    data = []
+    for first, second in rows:
+        if first is None:
+            duration = second or SLOT_MINUTES
+        else:
+            data.append((first, second))
+    return data, duration
+
+
+def get_busy_mask(date, master_id=None, salon_id=None, service_id=None):
+    """Занятые слоты дня, полученные одним запросом.
+
+    Если выбран мастер, занятость читается из MasterDayAvailability.
+    Иначе слот занят, если на него есть запись на выбранную услугу
+    в выбранном салоне. Слоты, начав с которых выбранная услуга
+    пересеклась бы с записью или не закончилась бы до закрытия, тоже
+    считаются занятыми.
+    """
+    if master_id:
+        rows = (
+            MasterDayAvailability.objects.filter(master_id=master_id, date=date)
+            .order_by()
+            .annotate(empty=Value(None, output_field=BigIntegerField()))
+            .values_list("busy_mask", "empty")
+        )
+        masks, duration = _split_service_duration(
+            _with_service_duration(rows, service_id, BigIntegerField())
+        )
+        busy_mask = 0
+        for mask, _ in masks:
+            busy_mask |= mask
+        closing = closing_mask(duration, working_mask(salon_id, date))
+        return expand_busy_mask(busy_mask, duration) | closing
+
+    if not (service_id and salon_id):
+        return 0
+
+    rows = occupied(
+        ("appointment_time", "service__duration"),
+        service_id=service_id,
+        salon_id=salon_id,
+        appointment_date=date,
+    )
+    intervals, duration = _split_service_duration(
+        _with_service_duration(rows, service_id, TimeField())
+    )
+    schedule = DaySchedule.from_appointments(intervals)
+    closing = closing_mask(duration, working_mask(salon_id, date))
+    return schedule.busy_mask(duration) | closing
+
+
+def get_free_masks(
+    dates, duration=SLOT_MINUTES, master_id=None, salon_id=None, now=None
+):
+    """Маски свободных слотов на несколько дат одним запросом.
+
+    Слот свободен, если он рабочий, начинается не раньше чем через час
+    и услуга длительностью duration, начатая в нем, не пересекается
+    с записями.
+    """
+    rows = MasterDayAvailability.objects.filter(date__in=dates)
+    if master_id:
+        rows = rows.filter(master_id=master_id)
+    if salon_id:
+        rows = rows.filter(salon_id=salon_id)
+    masks = _masks_by_date(rows.values_list("date", "busy_mask"))
+
+    earliest = earliest_start(now)
+    return {
+        date: bookable_mask(date, earliest, duration, working_mask(salon_id, date))
+        & ~expand_busy_mask(masks.get(date, 0), duration)
+        for date in dates
+    }
+
+
+def _masks_by_date(rows):
+    """Объединить маски занятости по датам"""
+    masks = {}
+    for date, mask in rows:
+        masks[date] = masks.get(date, 0) | mask
+    return masks
+
+
+def get_busy_by_date(start, days, master_id=None, salon_id=None, service_id=None):
+    """Маски занятых слотов по датам горизонта одним запросом"""
+    end = start + timedelta(days=days)
+
+    if service_id:
+        # Занятость по услуге не материализуется, считаем по записям
+        filters = {
+            "service_id": service_id,
+            "appointment_date__gte": start,
+            "appointment_date__lt": end,
+        }
+        if master_id:
+            filters["master_id"] = master_id
+        if salon_id:
+            filters["salon_id"] = salon_id
+
+        schedules = group_schedules(
+            occupied(
+                ("appointment_date", "appointment_time", "service__duration"),
+                **filters,
+            )
+        )
+        masks = {
+            appointment_date: schedule.busy_mask()
+            for appointment_date, schedule in schedules.items()
+        }
+    else:
+        rows = MasterDayAvailability.objects.filter(date__gte=start, date__lt=end)
+        if master_id:
+            rows = rows.filter(master_id=master_id)
+        if salon_id:
+            rows = rows.filter(salon_id=salon_id)
+        masks = _masks_by_date(rows.values_list("date", "busy_mask"))
+
+    return masks
+
+
+def get_master_calendar(master, start, days, now=None, salon_id=None):
+    """Дни горизонта, в которые у мастера есть свободное время.
+
+    Занятость мастера за весь горизонт загружается одним запросом,
+    свободные дни вычисляются в памяти. День считается свободным,
+    если в него помещается самая короткая услуга мастера.
+    """
+    duration = master.services.filter(is_active=True).aggregate(
+        shortest=Min("duration")
+    )["shortest"]
+    if duration is None:
+        return []
+
+    masks = _masks_by_date(
+        MasterDayAvailability.objects.filter(
+            master=master,
+            date__gte=start,
+            date__lt=start + timedelta(days=days),
+        ).values_list("date", "busy_mask")
+    )
+
+    earliest = earliest_start(now)
+    dates = []
+    for i in range(days):
+        date = start + timedelta(days=i)
+        busy_mask = expand_busy_mask(masks.get(date, 0), duration)
+        working = working_mask(salon_id, date)
+        if bookable_mask(date, earliest, duration, working) & ~busy_mask:
+            dates.append(date)
+    return dates
+
+
+def availability_versions(date, master_id=None, salon_id=None, service_id=None):
+    """Счетчики версий, от которых зависит свободное время на дату"""
+    versions = [("availability",)]
+    if master_id:
+        versions.append(("availability", "master", master_id, date))
+    elif salon_id:
+        versions.append(("availability", "salon", salon_id, date))
+    if salon_id:
+        versions.append(("salon_schedule", salon_id))
+    if service_id:
+        versions.append(("availability", "service", service_id))
+    return versions
+
+
+def _masks_by_master(master_ids, start, days):
+    """Объединенные по салонам маски занятости мастеров за диапазон дат"""
+    masks = {}
+    rows = MasterDayAvailability.objects.filter(
+        master_id__in=master_ids,
+        date__gte=start,
+        date__lt=start + timedelta(days=days),
+    ).values_list("master_id", "date", "busy_mask")
+    for master_id, date, mask in rows:
+        key = (master_id, date)
+        masks[key] = masks.get(key, 0) | mask
+    return masks
+
+
+def get_availability_grid(
+    master_ids, start, days, duration=SLOT_MINUTES, now=None, salon_id=None
+):
+    """Свободные слоты мастеров по дням одним запросом.
+
+    Возвращает словарь: мастер -> список масок свободных слотов
+    на каждый день диапазона.
+    """
+    masks = _masks_by_master(master_ids, start, days)
+    dates = [start + timedelta(days=i) for i in range(days)]
+    earliest = earliest_start(now)
+    bookable = [
+        bookable_mask(date, earliest, duration, working_mask(salon_id, date))
+        for date in dates
+    ]
+
+    return {
+        master_id: [
+            day_mask & ~expand_busy_mask(masks.get((master_id, date), 0), duration)
+            for date, day_mask in zip(dates, bookable)
+        ]
+        for master_id in master_ids
+    }
+
+
+def _master_stream(position, master_id, free_mask):
+    """Свободные слоты одного мастера за день по возрастанию времени"""
+    for index in iter_slots(free_mask):
+        yield index, position, master_id
+
+
+def iter_free_slots(
+    master_ids, start, days, duration=SLOT_MINUTES, now=None, window=7, salons=None
+):
+    """Свободные слоты мастеров в хронологическом порядке.
+
+    Выдает тройки (дата, время, мастер). Рабочие часы берутся из
+    салона мастера по словарю salons (мастер -> салон). Занятость
+    читается окнами по window дней, следующее окно загружается, только
+    когда слотов предыдущего не хватило. Слоты мастеров за день сливаются через
+    очередь с приоритетом, при равном времени раньше идет мастер,
+    стоящий в master_ids первым.
+    """
+    salons = salons or {}
+    earliest = earliest_start(now)
+    for offset in range(0, days, window):
+        first = start + timedelta(days=offset)
+        window_days = min(window, days - offset)
+        masks = _masks_by_master(master_ids, first, window_days)
+
+        for i in range(window_days):
+            date = first + timedelta(days=i)
+            streams = [
+                _master_stream(
+                    position,
+                    master_id,
+                    bookable_mask(
+                        date,
+                        earliest,
+                        duration,
+                        working_mask(salons.get(master_id), date),
+                    )
+                    & ~expand_busy_mask(masks.get((master_id, date), 0), duration),
+                )
+                for position, master_id in enumerate(master_ids)
+            ]
+            for index, _, master_id in heapq.merge(*streams):
+                yield date, slot_time(index), master_id
+
+
+def refresh_day_availability(master_id, salon_id, date):
+    """Пересчитать занятость мастера в салоне за один день"""
+    rows = occupied(
+        ("appointment_time", "service__duration"),
+        master_id=master_id,
+        salon_id=salon_id,
+        appointment_date=date,
+    )
+    busy_mask = DaySchedule.from_appointments(rows).busy_mask()
+
+    if busy_mask:
+        # Вставка с обновлением при конфликте - один запрос без гонок
+        MasterDayAvailability.objects.bulk_create(
+            [
+                MasterDayAvailability(
+                    master_id=master_id,
+                    salon_id=salon_id,
+                    date=date,
+                    busy_mask=busy_mask,
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["master", "salon", "date"],
+            update_fields=["busy_mask"],
+        )
+    else:
+        MasterDayAvailability.objects.filter(
+            master_id=master_id, salon_id=salon_id, date=date
+        ).delete()
+
+    bump_version("availability", "master", master_id, date)
+    bump_version("availability", "salon", salon_id, date)
+    touch_stamp(MasterDayAvailability)
+
+
+def rebuild_day_availability(since=None, batch_size=1000):
+    """Пересобрать таблицу занятости мастеров по всем записям и удержаниям"""
+    filters = {}
+    existing = MasterDayAvailability.objects.all()
+    if since:
+        filters["appointment_date__gte"] = since
+        existing = existing.filter(date__gte=since)
+
+    intervals = {}
+    rows = occupied(
+        (
+            "master_id",
+            "salon_id",
+            "appointment_date",
+            "appointment_time",
+            "service__duration",
+        ),
+        **filters,
+    )
+    for master_id, salon_id, date, start_time, duration in rows.iterator():
+        key = (master_id, salon_id, date)
+        intervals.setdefault(key, []).append((start_time, duration))
+
+    objects = [
+        MasterDayAvailability(
+            master_id=master_id,
+            salon_id=salon_id,
+            date=date,
+            busy_mask=DaySchedule.from_appointments(day_rows).busy_mask(),
+        )
+        for (master_id, salon_id, date), day_rows in intervals.items()
+    ]
+
+    with transaction.atomic():
+        existing.delete()
+        MasterDayAvailability.objects.bulk_create(objects, batch_size=batch_size)
+        # Пересобранные дни могут затрагивать любого мастера и салон
+        bump_version("availability")
+        touch_stamp(MasterDayAvailability)
+
+    return len(objects)
+
+
+def group_by_period(slots):
+    """Сгруппировать время по периодам дня: утро, день, вечер"""
+    groups = []
+    slots = iter(slots)
+    current = next(slots, None)
+
+    for period, until in PERIODS:
+        times = []
+        while current is not None and (until is None or current < until):
+            times.append(current.strftime("%H:%M"))
+            current = next(slots, None)
+        if times:
+            groups.append({"period": period, "times": times})
+
+    return groups
@@ -0,0 +1,238 @@
+"""Оформление записи с защитой от двойного бронирования"""
+
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from ..models import Appointment, Client, Master, SlotHold
+from .availability import is_slot_free, refresh_day_availability
+from .validators import validate_appointment_datetime, validate_working_hours
+
+BUSY_MESSAGE = "Запись на это время недоступна для этого мастера."
+
+# Ключ кэша со сроком ближайшего удержания, False - удержаний нет
+NEXT_EXPIRY_KEY = "slot_holds:next_expiry"
+
+
+class SlotUnavailableError(Exception):
+    """Выбранное время занято или прямо сейчас бронируется другим клиентом"""
+
+
+@contextmanager
+def master_lock(*master_ids):
+    """Короткая транзакция под блокировкой мастеров.
+
+    Мастера блокируются по возрастанию id, чтобы параллельные
+    транзакции не ждали друг друга по кругу. Конфликты уникальности
+    и занятую базу превращает в SlotUnavailableError без повторных
+    попыток.
+    """
+    try:
+        with transaction.atomic():
+            # Блокируем мастеров до конца транзакции
+            list(
+                Master.objects.select_for_update()
+                .filter(pk__in=master_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            yield
+    except IntegrityError:
+        raise SlotUnavailableError(BUSY_MESSAGE)
+    except OperationalError as error:
+        # SQLite сообщает о занятой параллельной транзакцией базе ошибкой
+        if "locked" not in str(error):
+            raise
+        raise SlotUnavailableError(
+            "Это время сейчас бронирует другой клиент. Пожалуйста, выберите другое."
+        )
+
+
+def validate_booking(*, master, service, salon, appointment_date, appointment_time):
+    """Проверить, что на это время можно записаться.
+
+    Время должно быть в будущем и в часы работы салона с учетом
+    длительности услуги, мастер должен работать в салоне и оказывать
+    услугу. При нарушении выбрасывает ValidationError.
+    """
+    validate_working_hours(
+        appointment_time, salon.pk, appointment_date, service.duration
+    )
+    validate_appointment_datetime(appointment_date, appointment_time)
+
+    # Обе связи проверяются одним запросом, причина ищется только при отказе
+    if Master.objects.filter(pk=master.pk, salons=salon, services=service).exists():
+        return
+    if not master.salons.filter(pk=salon.pk).exists():
+        raise ValidationError(f"Мастер {master.name} не работает в салоне {salon.name}")
+    raise ValidationError(f"Мастер {master.name} не оказывает услугу {service.name}")
+
+
+def _hold_keys(holds):
+    return set(holds.values_list("master_id", "salon_id", "appointment_date"))
+
+
+def release_holds(session_key, refreshed_key=None):
+    """Снять удержания сессии и освободить их время.
+
+    День refreshed_key не пересчитывается, его занятость обновит
+    вызывающий код.
+    """
+    holds = SlotHold.objects.filter(session_key=session_key)
+    keys = _hold_keys(holds)
+    if not keys:
+        return
+    holds.delete()
+    for key in keys - {refreshed_key}:
+        refresh_day_availability(*key)
+
+
+def hold_slot(
+    session_key, *, master, salon, service, appointment_date, appointment_time
+):
+    """Удержать время мастера за сессией.
+
+    Прежние удержания сессии снимаются. Если время занято записью
+    или чужим удержанием, выбрасывает SlotUnavailableError.
+    """
+    with master_lock(master.pk):
+        release_holds(session_key, (master.pk, salon.pk, appointment_date))
+        if not is_slot_free(
+            master.pk,
+            appointment_date,
+            appointment_time,
+            service.duration,
+            hold_key=session_key,
+        ):
+            raise SlotUnavailableError(BUSY_MESSAGE)
+
+        # Просроченное удержание того же слота еще не удалено очисткой
+        SlotHold.objects.filter(
+            master=master,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            expires_at__lte=timezone.now(),
+        ).delete()
+
+        hold = SlotHold.objects.create(
+            master=master,
+            salon=salon,
+            service=service,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            session_key=session_key,
+            expires_at=timezone.now() + timedelta(minutes=settings.SLOT_HOLD_MINUTES),
+        )
+        refresh_day_availability(master.pk, salon.pk, appointment_date)
+        transaction.on_commit(lambda: _lower_next_expiry(hold.expires_at))
+    return hold
+
+
+def _lower_next_expiry(expires_at):
+    next_expiry = cache.get(NEXT_EXPIRY_KEY)
+    if next_expiry is False or (next_expiry and next_expiry > expires_at):
+        cache.set(NEXT_EXPIRY_KEY, expires_at, settings.SLOT_HOLD_MINUTES * 60)
+
+
+def expire_holds(now=None):
+    """Удалить просроченные удержания и пересчитать освободившиеся дни"""
+    expired = SlotHold.objects.filter(expires_at__lte=now or timezone.now())
+    keys = _hold_keys(expired)
+    deleted, _ = expired.delete()
+    for key in keys:
+        refresh_day_availability(*key)
+    return deleted
+
+
+def expire_due_holds(now=None):
+    """Удалить просроченные удержания, если срок ближайшего уже наступил.
+
+    Срок ближайшего удержания хранится в кэше, поэтому, пока ни одно
+    удержание не истекло, проверка не обращается к базе. Запись в кэше
+    живет SLOT_HOLD_MINUTES и затем пересчитывается.
+    """
+    now = now or timezone.now()
+    next_expiry = cache.get(NEXT_EXPIRY_KEY)
+    if next_expiry is False or (next_expiry and next_expiry > now):
+        return 0
+
+    deleted = expire_holds(now)
+    next_expiry = SlotHold.objects.aggregate(Min("expires_at"))["expires_at__min"]
+    cache.set(
+        NEXT_EXPIRY_KEY,
+        next_expiry or False,
+        settings.SLOT_HOLD_MINUTES * 60,
+    )
+    return deleted
+
+
+def save_client(phone, name, email=""):
+    """Найти клиента по телефону и обновить его имя и почту"""
+    client = Client.objects.filter(phone=phone).first()
+    if client is None:
+        return Client.objects.create(phone=phone, name=name, email=email)
+    if (client.name, client.email) != (name, email):
+        client.name = name
+        client.email = email
+        client.save(update_fields=["name", "email"])
+    return client
+
+
+def book_appointment(
+    *,
+    client,
+    master,
+    service,
+    salon,
+    appointment_date,
+    appointment_time,
+    promo_code=None,
+    notes="",
+    hold_key=None,
+):
+    """Создать запись, если время мастера свободно.
+
+    client - клиент или функция без аргументов, которая его возвращает.
+    Функция вызывается в той же транзакции после проверки времени,
+    поэтому при конфликте данные клиента не меняются.
+
+    Удержания сессии hold_key не мешают записи и снимаются в той же
+    транзакции. Повторных попыток не делает: при конфликте сразу
+    выбрасывает SlotUnavailableError, чтобы клиент выбрал другое время.
+    """
+    with master_lock(master.pk):
+        if not is_slot_free(
+            master.pk,
+            appointment_date,
+            appointment_time,
+            service.duration,
+            hold_key=hold_key,
+        ):
+            raise SlotUnavailableError(BUSY_MESSAGE)
+
+        if hold_key:
+            # День новой записи пересчитает сигнал сохранения записи
+            release_holds(hold_key, (master.pk, salon.pk, appointment_date))
+
+        if callable(client):
+            client = client()
+
+        return Appointment.objects.create(
+            client=client,
+            master=master,
+            service=service,
+            salon=salon,
+            appointment_date=appointment_date,
+            appointment_time=appointment_time,
+            status="pending",
+            promo_code=promo_code,
+            original_price=service.price,
+            final_price=service.price,
+            notes=notes,
+        )
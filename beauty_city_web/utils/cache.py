@@ -0,0 +1,104 @@
+"""Кэширование ответов с версионными ключами"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(*parts):
+    """Ключ счетчика версии"""
+    return "version:" + ":".join(str(part) for part in parts)
+
+
+def get_versions(keys):
+    """Текущие значения счетчиков версий.
+
+    Отсутствующий счетчик создается со значением от текущего времени,
+    чтобы после вытеснения из кэша он не совпал с прежним значением.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(*parts):
+    """Увеличить счетчик версии, сделав зависящие от него ответы устаревшими.
+
+    Счетчик меняется после фиксации транзакции, иначе параллельный запрос
+    успеет закэшировать еще не зафиксированное состояние под новой версией.
+    """
+    key = version_key(*parts)
+    transaction.on_commit(lambda: _bump(key))
+
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def stamp_key(model):
+    """Ключ отметки времени последнего изменения модели"""
+    return f"stamp:{model._meta.label_lower}"
+
+
+def touch_stamp(*models):
+    """Отметить изменение данных моделей временем фиксации транзакции"""
+    keys = [stamp_key(model) for model in models]
+    transaction.on_commit(lambda: _touch(keys))
+
+
+def _touch(keys):
+    cache.set_many(dict.fromkeys(keys, time.time_ns()), timeout=None)
+
+
+def _increment(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+def count_access(namespace, hit):
+    """Учесть попадание или промах кэша в статистике пространства имен"""
+    _increment(f"stats:{namespace}:{'hits' if hit else 'misses'}")
+
+
+def get_cache_stats(namespace):
+    """Количество попаданий и промахов кэша для пространства имен"""
+    stats = cache.get_many([f"stats:{namespace}:hits", f"stats:{namespace}:misses"])
+    hits = stats.get(f"stats:{namespace}:hits", 0)
+    misses = stats.get(f"stats:{namespace}:misses", 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def get_or_build(namespace, key_parts, version_parts, build, timeout=None):
+    """Получить значение из кэша или построить и сохранить его.
+
+    key_parts определяют ответ, version_parts — список наборов частей
+    ключей счетчиков версий, от которых ответ зависит.
+    """
+    versions = get_versions([version_key(*parts) for parts in version_parts])
+    key = ":".join(
+        [namespace, *(str(part) for part in key_parts), *(str(v) for v in versions)]
+    )
+
+    value = cache.get(key)
+    count_access(namespace, value is not None)
+    if value is not None:
+        return value
+
+    value = build()
+    cache.set(key, value, timeout)
+    return value
@@ -0,0 +1,254 @@
+"""Снимок каталога: салоны, категории, услуги, мастера и их связи"""
+
+import json
+from hashlib import sha256
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import Master, Salon, Service, ServiceCategory
+from .cache import bump_version, get_or_build, get_versions, version_key
+from .images import photo_srcset
+
+CATALOG_VERSION = ("catalog",)
+
+# Снимок и индекс текущего процесса: (версия, снимок, индекс)
+_local = (None, None, None)
+
+
+def _photo_url(photo):
+    return photo.url if photo else None
+
+
+def build_catalog():
+    """Документ каталога из активных объектов, шесть запросов"""
+    salons = [
+        {
+            "id": salon.id,
+            "name": salon.name,
+            "address": salon.address,
+            "phone": str(salon.phone) if salon.phone else "",
+            "working_hours": salon.working_hours,
+            "photo_url": _photo_url(salon.photo),
+            "photo_srcset": photo_srcset(salon),
+        }
+        for salon in Salon.objects.filter(is_active=True).order_by("id")
+    ]
+    categories = [
+        {"id": category.id, "name": category.name, "order": category.order}
+        for category in ServiceCategory.objects.order_by("order", "id")
+    ]
+    services = [
+        {
+            "id": service.id,
+            "name": service.name,
+            "category_id": service.category_id,
+            "price": float(service.price),
+            "duration": service.duration,
+            "photo_url": _photo_url(service.photo),
+            "photo_srcset": photo_srcset(service),
+        }
+        for service in Service.objects.filter(is_active=True).order_by("order", "id")
+    ]
+
+    salon_links = {}
+    for master_id, salon_id in (
+        Master.salons.through.objects.filter(salon__is_active=True)
+        .order_by("salon_id")
+        .values_list("master_id", "salon_id")
+    ):
+        salon_links.setdefault(master_id, []).append(salon_id)
+
+    service_links = {}
+    for master_id, service_id in (
+        Master.services.through.objects.filter(service__is_active=True)
+        .order_by("service_id")
+        .values_list("master_id", "service_id")
+    ):
+        service_links.setdefault(master_id, []).append(service_id)
+
+    masters = [
+        {
+            "id": master.id,
+            "name": master.name,
+            "specialty": master.specialty,
+            "experience": master.experience,
+            "rating": round(master.avg_rating, 2),
+            "review_count": master.review_count,
+            "photo_url": _photo_url(master.photo),
+            "photo_srcset": photo_srcset(master),
+            "salon_ids": salon_links.get(master.id, []),
+            "service_ids": service_links.get(master.id, []),
+        }
+        for master in Master.objects.filter(is_active=True).order_by("order", "id")
+    ]
+
+    return {
+        "salons": salons,
+        "categories": categories,
+        "services": services,
+        "masters": masters,
+    }
+
+
+def _build_snapshot():
+    data = build_catalog()
+    body = json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":")).encode()
+    return {"data": data, "body": body, "etag": f'"{sha256(body).hexdigest()}"'}
+
+
+class CatalogIndex:
+    """Связи мастеров, салонов и услуг снимка в виде множеств id"""
+
+    def __init__(self, data):
+        self.masters = {master["id"]: master for master in data["masters"]}
+        self.salons = {salon["id"]: salon for salon in data["salons"]}
+        self.services = {service["id"]: service for service in data["services"]}
+
+        self.master_salons = {
+            master_id: frozenset(master["salon_ids"])
+            for master_id, master in self.masters.items()
+        }
+        self.master_services = {
+            master_id: frozenset(master["service_ids"])
+            for master_id, master in self.masters.items()
+        }
+        self.salon_masters = self._invert(self.master_salons, self.salons)
+        self.service_masters = self._invert(self.master_services, self.services)
+        self.salon_services = {
+            salon_id: frozenset().union(
+                *(self.master_services[master_id] for master_id in master_ids)
+            )
+            for salon_id, master_ids in self.salon_masters.items()
+        }
+
+    @staticmethod
+    def _invert(links, targets):
+        inverted = {target_id: set() for target_id in targets}
+        for source_id, target_ids in links.items():
+            for target_id in target_ids:
+                inverted[target_id].add(source_id)
+        return {
+            target_id: frozenset(source_ids)
+            for target_id, source_ids in inverted.items()
+        }
+
+    def compatible(self, master_id, salon_id):
+        """Работает ли мастер в салоне"""
+        return int(salon_id) in self.master_salons.get(int(master_id), ())
+
+    def master_ids(self, salon_id=None, service_id=None):
+        """Мастера салона, оказывающие услугу, None - без ограничений"""
+        if not salon_id and not service_id:
+            return None
+        master_ids = set(self.masters)
+        if salon_id:
+            master_ids &= self.salon_masters.get(int(salon_id), frozenset())
+        if service_id:
+            master_ids &= self.service_masters.get(int(service_id), frozenset())
+        return master_ids
+
+    def service_ids(self, salon_id=None, master_id=None):
+        """Услуги мастера в салоне, None - без ограничений"""
+        if not salon_id and not master_id:
+            return None
+        service_ids = set(self.services)
+        if salon_id:
+            service_ids &= self.salon_services.get(int(salon_id), frozenset())
+        if master_id:
+            service_ids &= self.master_services.get(int(master_id), frozenset())
+        return service_ids
+
+    def matrix(self):
+        """Все связи одним документом для страницы записи"""
+
+        def listed(links):
+            return {str(key): sorted(value) for key, value in links.items()}
+
+        return {
+            "master_salons": listed(self.master_salons),
+            "master_services": listed(self.master_services),
+            "salon_masters": listed(self.salon_masters),
+            "salon_services": listed(self.salon_services),
+            "service_masters": listed(self.service_masters),
+        }
+
+
+def _current():
+    """Снимок и индекс текущей версии, из памяти процесса или из кэша"""
+    global _local
+    version = get_versions([version_key(*CATALOG_VERSION)])[0]
+    if _local[0] != version:
+        snapshot = get_or_build(
+            "catalog_snapshot", (), [CATALOG_VERSION], _build_snapshot
+        )
+        _local = (version, snapshot, CatalogIndex(snapshot["data"]))
+    return _local
+
+
+def get_catalog():
+    """Снимок каталога: data, готовый JSON body и etag"""
+    return _current()[1]
+
+
+def get_catalog_index():
+    """Индекс связей текущего снимка каталога"""
+    return _current()[2]
+
+
+def rebuild_catalog():
+    """Сбросить снимок каталога и сразу собрать новый"""
+    bump_version(*CATALOG_VERSION)
+    return get_catalog()
+
+
+def filter_masters(salon_id=None, service_id=None):
+    """Мастера снимка, работающие в салоне и оказывающие услугу"""
+    _, catalog, index = _current()
+    allowed = index.master_ids(salon_id, service_id)
+    if allowed is None:
+        return catalog["data"]["masters"]
+    return [m for m in catalog["data"]["masters"] if m["id"] in allowed]
+
+
+def build_service_tree(salon_id=None, master_id=None):
+    """Категории в порядке отображения с активными услугами"""
+    _, catalog, index = _current()
+    catalog = catalog["data"]
+    allowed = index.service_ids(salon_id, master_id)
+
+    by_category = {}
+    for service in catalog["services"]:
+        if allowed is None or service["id"] in allowed:
+            by_category.setdefault(service["category_id"], []).append(
+                {
+                    key: service[key]
+                    for key in (
+                        "id",
+                        "name",
+                        "price",
+                        "duration",
+                        "photo_url",
+                        "photo_srcset",
+                    )
+                }
+            )
+
+    return [
+        {
+            "id": category["id"],
+            "name": category["name"],
+            "services": by_category[category["id"]],
+        }
+        for category in catalog["categories"]
+        if category["id"] in by_category
+    ]
+
+
+def get_service_tree(salon_id=None, master_id=None):
+    """Дерево услуг из кэша"""
+    return get_or_build(
+        "service_tree",
+        (salon_id or "any", master_id or "any"),
+        [CATALOG_VERSION],
+        lambda: build_service_tree(salon_id, master_id),
+    )
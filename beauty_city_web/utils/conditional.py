@@ -0,0 +1,97 @@
+"""Условные GET-запросы и заголовки кэширования для публичных API"""
+
+import time
+from functools import wraps
+from hashlib import sha256
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from ..models import (
+    Master,
+    MasterDayAvailability,
+    Salon,
+    SalonClosure,
+    SalonWorkingHours,
+    Service,
+    ServiceCategory,
+)
+from .availability import SLOT_MINUTES
+from .booking import expire_due_holds
+from .cache import get_versions, stamp_key
+
+
+def conditional_get(*models, max_age, stale_while_revalidate, bucket=None, before=None):
+    """Отвечать 304 по отметкам моделей и задавать политику кэширования.
+
+    bucket - интервал в секундах для ответов, которые меняются со
+    временем без изменения данных, например свободные слоты. before
+    вызывается до чтения отметок и может их обновить.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(request, *args, **kwargs)
+
+            if before:
+                before()
+            stamps = get_versions([stamp_key(model) for model in models])
+            parts = [request.get_full_path(), *stamps]
+            modified = max(stamps) // 10**9
+            if bucket:
+                started = int(time.time()) // bucket * bucket
+                parts.append(started)
+                modified = max(modified, started)
+            etag = '"%s"' % sha256("\n".join(map(str, parts)).encode()).hexdigest()
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(modified)
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=max_age,
+                stale_while_revalidate=stale_while_revalidate,
+            )
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def catalog_get(view):
+    """Данные каталога: меняются несколько раз в день"""
+    return conditional_get(
+        Salon,
+        ServiceCategory,
+        Service,
+        Master,
+        max_age=300,
+        stale_while_revalidate=86400,
+    )(view)
+
+
+def availability_get(view):
+    """Свободное время: меняется с каждой записью и с течением времени"""
+    return conditional_get(
+        MasterDayAvailability,
+        SalonWorkingHours,
+        SalonClosure,
+        Service,
+        Master,
+        max_age=5,
+        stale_while_revalidate=30,
+        bucket=SLOT_MINUTES * 60,
+        # Снятые просроченные удержания должны попасть в отметки до 304
+        before=expire_due_holds,
+    )(view)
@@ -0,0 +1,99 @@
+"""Повторная доставка POST-запросов с заголовком Idempotency-Key"""
+
+from functools import wraps
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+# Сколько секунд ключ считается занятым обрабатываемым запросом
+IN_PROGRESS_TIMEOUT = 60
+
+
+def _client_identity(request):
+    """Клиент запроса: ключ его сессии, а без нее - адрес"""
+    return request.session.session_key or request.META.get("REMOTE_ADDR", "")
+
+
+def _store_key(request, key, identity):
+    digest = sha256(f"{identity}\n{request.path}\n{key}".encode()).hexdigest()
+    return f"idempotency:{digest}"
+
+
+def idempotent(view):
+    """Сохранять ответы представления по заголовку Idempotency-Key.
+
+    Ключ действует только для клиента, который его прислал. Ответы
+    с ошибкой сервера не сохраняются, такой запрос можно повторить
+    с тем же ключом. Ключ, использованный с другим телом запроса,
+    отклоняется.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != "POST" or not key:
+            return view(request, *args, **kwargs)
+
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse(
+                {"success": False, "error": "Слишком длинный Idempotency-Key"},
+                status=400,
+            )
+
+        store = caches["idempotency"]
+        identity = _client_identity(request)
+        store_key = _store_key(request, key, identity)
+        fingerprint = sha256(request.body).hexdigest()
+
+        entry = {"identity": identity, "fingerprint": fingerprint}
+        if store.add(store_key, entry, IN_PROGRESS_TIMEOUT):
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                store.delete(store_key)
+                raise
+
+            if response.status_code >= 500:
+                store.delete(store_key)
+            else:
+                store.set(
+                    store_key,
+                    {
+                        **entry,
+                        "status": response.status_code,
+                        "content": response.content,
+                        "content_type": response["Content-Type"],
+                    },
+                    settings.IDEMPOTENCY_KEY_TIMEOUT,
+                )
+            return response
+
+        stored = store.get(store_key)
+        if stored is None or "status" not in stored:
+            return JsonResponse(
+                {"success": False, "error": "Запрос с этим ключом еще обрабатывается"},
+                status=409,
+            )
+        if stored["identity"] != identity or stored["fingerprint"] != fingerprint:
+            return JsonResponse(
+                {
+                    "success": False,
+                    "error": "Idempotency-Key уже использован для другого запроса",
+                },
+                status=422,
+            )
+
+        response = HttpResponse(
+            stored["content"],
+            status=stored["status"],
+            content_type=stored["content_type"],
+        )
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    return wrapper
@@ -0,0 +1,121 @@
+"""Уменьшенные копии фотографий салонов, услуг и мастеров в WebP"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha256
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_version, touch_stamp
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 1280)
+VARIANT_QUALITY = 80
+
+_executor = None
+
+
+def render_variants(stream):
+    """WebP-копии изображения {ширина: байты}, без увеличения"""
+    with Image.open(stream) as image:
+        image = ImageOps.exif_transpose(image)
+    has_alpha = "A" in image.getbands() or "transparency" in image.info
+    image = image.convert("RGBA" if has_alpha else "RGB")
+
+    variants = {}
+    for width in VARIANT_WIDTHS:
+        width = min(width, image.width)
+        if width in variants:
+            continue
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        resized.save(buffer, "WEBP", quality=VARIANT_QUALITY, method=6)
+        variants[width] = buffer.getvalue()
+    return variants
+
+
+def variant_name(photo, width, content):
+    """Имя копии с хэшем содержимого рядом с каталогом загрузки фото"""
+    digest = sha256(content).hexdigest()[:16]
+    return f"variants/{photo.field.upload_to}{digest}-{width}w.webp"
+
+
+def needs_variants(instance):
+    """Копии отсутствуют или сделаны из другого фото"""
+    variants = instance.photo_variants or {}
+    return (instance.photo.name or "") != variants.get("source", "")
+
+
+def generate_variants(model, pk):
+    """Подготовить копии фото объекта и записать их в photo_variants"""
+    from .catalog import CATALOG_VERSION
+
+    instance = model.objects.filter(pk=pk).only("photo").first()
+    if instance is None:
+        return None
+
+    photo = instance.photo
+    widths = {}
+    if photo:
+        try:
+            with photo.open("rb") as stream:
+                rendered = render_variants(stream)
+        except (OSError, Image.DecompressionBombError) as error:
+            logger.warning("Не удалось обработать фото %s: %s", photo.name, error)
+            rendered = {}
+        for width, content in rendered.items():
+            name = variant_name(photo, width, content)
+            if not photo.storage.exists(name):
+                name = photo.storage.save(name, ContentFile(content))
+            widths[str(width)] = name
+
+    variants = {"source": photo.name or "", "widths": widths}
+    # Пока готовились копии, фото могли заменить
+    if model.objects.filter(pk=pk, photo=photo.name).update(photo_variants=variants):
+        bump_version(*CATALOG_VERSION)
+        touch_stamp(model)
+    return variants
+
+
+def _generate_in_background(model, pk):
+    try:
+        generate_variants(model, pk)
+    except Exception:
+        logger.exception("Ошибка подготовки копий фото %s %s", model.__name__, pk)
+    finally:
+        connection.close()
+
+
+def schedule_variants(instance):
+    """Подготовить копии фото после фиксации транзакции"""
+    model, pk = type(instance), instance.pk
+
+    def run():
+        global _executor
+        if not settings.IMAGE_VARIANTS_BACKGROUND:
+            generate_variants(model, pk)
+            return
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="image-variants"
+            )
+        _executor.submit(_generate_in_background, model, pk)
+
+    transaction.on_commit(run)
+
+
+def photo_srcset(instance):
+    """Адреса копий фото по ширинам, пустой словарь - копий еще нет"""
+    if not instance.photo or needs_variants(instance):
+        return {}
+    storage = instance.photo.storage
+    return {
+        width: storage.url(name)
+        for width, name in instance.photo_variants["widths"].items()
+    }
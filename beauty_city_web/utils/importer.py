@@ -0,0 +1,310 @@
+"""Массовая загрузка клиентов и записей из выгрузок других систем"""
+
+import csv
+import json
+from datetime import date, time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from phonenumbers import (
+    NumberParseException,
+    PhoneNumberFormat,
+    format_number,
+    is_valid_number,
+    parse,
+)
+
+from ..models import Appointment, Client, Master, Salon, Service
+from .availability import (
+    ACTIVE_STATUSES,
+    DaySchedule,
+    occupied,
+    refresh_day_availability,
+)
+from .booking import SlotUnavailableError, master_lock
+from .validators import validate_working_hours
+
+STATUSES = {value for value, _ in Appointment.STATUS_CHOICES}
+
+
+def read_rows(path, file_format=None):
+    """Строки файла с номерами строк, формат определяется по расширению"""
+    path = Path(path)
+    file_format = file_format or path.suffix.lstrip(".").lower()
+
+    with path.open(encoding="utf-8-sig", newline="") as stream:
+        if file_format == "csv":
+            # Первая строка файла - заголовок
+            for line, row in enumerate(csv.DictReader(stream), start=2):
+                yield line, row
+        elif file_format in ("jsonl", "ndjson"):
+            for line, text in enumerate(stream, start=1):
+                if text.strip():
+                    try:
+                        yield line, json.loads(text)
+                    except json.JSONDecodeError:
+                        yield line, None
+        else:
+            raise ValueError(f"Неизвестный формат файла: {file_format}")
+
+
+def normalize_phones(phones, region="RU"):
+    """Телефоны в формате E.164, для неверных номеров None"""
+    normalized = {}
+    for phone in phones:
+        try:
+            parsed = parse(phone, region)
+        except NumberParseException:
+            normalized[phone] = None
+            continue
+        normalized[phone] = (
+            format_number(parsed, PhoneNumberFormat.E164)
+            if is_valid_number(parsed)
+            else None
+        )
+    return normalized
+
+
+class BookingImporter:
+    """Загрузка клиентов и записей пачками.
+
+    Строка файла описывает клиента и, если заданы дата и время, его
+    запись: phone, name, email, date (ГГГГ-ММ-ДД), time (ЧЧ:ММ),
+    master_id, salon_id, service_id, status, price, notes.
+    """
+
+    def __init__(self, batch_size=1000, today=None):
+        self.batch_size = batch_size
+        self.today = today or timezone.localdate()
+        self.masters = set(Master.objects.values_list("id", flat=True))
+        self.salons = set(Salon.objects.values_list("id", flat=True))
+        self.prices = dict(Service.objects.values_list("id", "price"))
+        self.durations = dict(Service.objects.values_list("id", "duration"))
+        self.master_salons = set(
+            Master.salons.through.objects.values_list("master_id", "salon_id")
+        )
+        self.master_services = set(
+            Master.services.through.objects.values_list("master_id", "service_id")
+        )
+        self.name_field = Client._meta.get_field("name")
+
+        self.rows = 0
+        self.clients_created = 0
+        self.clients_updated = 0
+        self.appointments_created = 0
+        self.errors = []
+
+    def import_rows(self, rows, on_batch=None):
+        """Загрузить строки, после каждой пачки вызывается on_batch(self)"""
+        rows = iter(rows)
+        while batch := list(islice(rows, self.batch_size)):
+            self.import_batch(batch)
+            if on_batch:
+                on_batch(self)
+        return self
+
+    def import_batch(self, batch):
+        self.rows += len(batch)
+        phones = normalize_phones(
+            {str(row.get("phone") or "") for _, row in batch if row is not None}
+        )
+
+        clients = {}
+        candidates = []
+        for line, row in batch:
+            if row is None:
+                self.errors.append((line, "Строка не разобрана"))
+                continue
+            phone = phones.get(str(row.get("phone") or ""))
+            if not phone:
+                self.errors.append((line, "Неверный номер телефона"))
+                continue
+            name = (row.get("name") or "").strip()
+            try:
+                self.name_field.run_validators(name)
+            except ValidationError as error:
+                self.errors.append((line, error.messages[0]))
+                continue
+
+            clients[phone] = (name, (row.get("email") or "").strip())
+            if row.get("date") or row.get("time"):
+                candidate = self.parse_appointment(line, row)
+                if candidate:
+                    candidates.append((line, phone, candidate))
+
+        # Мастеров активных записей блокируем, как при оформлении записи
+        master_ids = {
+            fields["master_id"]
+            for _, _, fields in candidates
+            if fields["status"] in ACTIVE_STATUSES
+        }
+        counters = (self.clients_created, self.clients_updated)
+        try:
+            with master_lock(*master_ids):
+                by_phone = self.upsert_clients(clients)
+                appointments = self.build_appointments(candidates, by_phone)
+                Appointment.objects.bulk_create(
+                    appointments, batch_size=self.batch_size
+                )
+        except SlotUnavailableError as error:
+            self.clients_created, self.clients_updated = counters
+            self.errors.append((batch[0][0], f"Пачка не загружена: {error}"))
+            return
+        self.appointments_created += len(appointments)
+
+        # bulk_create не вызывает сигналы, обновляем занятость мастеров сами
+        keys = {
+            (item.master_id, item.salon_id, item.appointment_date)
+            for item in appointments
+            if item.status in ACTIVE_STATUSES and item.appointment_date >= self.today
+        }
+        for key in keys:
+            refresh_day_availability(*key)
+
+    def parse_appointment(self, line, row):
+        """Поля записи из строки файла или None с ошибкой в self.errors"""
+        try:
+            appointment_date = date.fromisoformat(str(row.get("date")))
+            appointment_time = time.fromisoformat(str(row.get("time")))
+            master_id = int(row.get("master_id"))
+            salon_id = int(row.get("salon_id"))
+            service_id = int(row.get("service_id"))
+        except (TypeError, ValueError):
+            self.errors.append((line, "Неверные дата, время или идентификаторы"))
+            return None
+
+        if master_id not in self.masters:
+            self.errors.append((line, f"Мастер {master_id} не найден"))
+            return None
+        if salon_id not in self.salons:
+            self.errors.append((line, f"Салон {salon_id} не найден"))
+            return None
+        if service_id not in self.prices:
+            self.errors.append((line, f"Услуга {service_id} не найдена"))
+            return None
+
+        if (master_id, salon_id) not in self.master_salons:
+            self.errors.append(
+                (line, f"Мастер {master_id} не работает в салоне {salon_id}")
+            )
+            return None
+        if (master_id, service_id) not in self.master_services:
+            self.errors.append(
+                (line, f"Мастер {master_id} не оказывает услугу {service_id}")
+            )
+            return None
+
+        try:
+            validate_working_hours(
+                appointment_time,
+                salon_id,
+                appointment_date,
+                self.durations[service_id],
+            )
+        except ValidationError as error:
+            self.errors.append((line, error.messages[0]))
+            return None
+
+        status = row.get("status") or (
+            "completed" if appointment_date < self.today else "pending"
+        )
+        if status not in STATUSES:
+            self.errors.append((line, f"Неизвестный статус {status}"))
+            return None
+
+        price = self.prices[service_id]
+        if row.get("price") not in (None, ""):
+            try:
+                price = Decimal(str(row["price"]))
+            except InvalidOperation:
+                self.errors.append((line, "Неверная цена"))
+                return None
+
+        return {
+            "master_id": master_id,
+            "salon_id": salon_id,
+            "service_id": service_id,
+            "appointment_date": appointment_date,
+            "appointment_time": appointment_time,
+            "status": status,
+            "original_price": price,
+            "final_price": price,
+            "notes": row.get("notes") or "",
+        }
+
+    def upsert_clients(self, clients):
+        """Обновить найденных по телефону клиентов и создать остальных"""
+        by_phone = {}
+        # При дублях телефона в базе берем самого раннего клиента
+        for client in Client.objects.filter(phone__in=list(clients)).order_by("-id"):
+            by_phone[client.phone.as_e164] = client
+
+        changed = []
+        for phone, client in by_phone.items():
+            name, email = clients[phone]
+            if client.name != name or (email and client.email != email):
+                client.name = name
+                client.email = email or client.email
+                changed.append(client)
+        Client.objects.bulk_update(
+            changed, ["name", "email"], batch_size=self.batch_size
+        )
+        self.clients_updated += len(changed)
+
+        created = Client.objects.bulk_create(
+            [
+                Client(phone=phone, name=name, email=email)
+                for phone, (name, email) in clients.items()
+                if phone not in by_phone
+            ],
+            batch_size=self.batch_size,
+        )
+        self.clients_created += len(created)
+        by_phone.update((client.phone.as_e164, client) for client in created)
+        return by_phone
+
+    def build_appointments(self, candidates, by_phone):
+        """Записи пачки без пересечений с занятостью мастеров.
+
+        Занятость считается по активным записям и действующим удержаниям
+        с учетом длительности услуг, принятые строки сразу добавляются
+        в расписание дня, поэтому пересечения внутри файла тоже
+        отсекаются.
+        """
+        active = [
+            fields for _, _, fields in candidates if fields["status"] in ACTIVE_STATUSES
+        ]
+        busy = {}
+        if active:
+            rows = occupied(
+                (
+                    "master_id",
+                    "appointment_date",
+                    "appointment_time",
+                    "service__duration",
+                ),
+                master_id__in={fields["master_id"] for fields in active},
+                appointment_date__in={fields["appointment_date"] for fields in active},
+            )
+            for master_id, day, start, duration in rows:
+                busy.setdefault((master_id, day), []).append((start, duration))
+        schedules = {
+            key: DaySchedule.from_appointments(rows) for key, rows in busy.items()
+        }
+
+        appointments = []
+        for line, phone, fields in candidates:
+            if fields["status"] in ACTIVE_STATUSES:
+                schedule = schedules.setdefault(
+                    (fields["master_id"], fields["appointment_date"]), DaySchedule()
+                )
+                duration = self.durations[fields["service_id"]]
+                if not schedule.is_free(fields["appointment_time"], duration):
+                    self.errors.append((line, "Время мастера уже занято"))
+                    continue
+                schedule.add(fields["appointment_time"], duration)
+            appointments.append(Appointment(client=by_phone[phone], **fields))
+        return appointments
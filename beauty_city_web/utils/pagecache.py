@@ -0,0 +1,85 @@
+"""Кэш публичных страниц и их разделов"""
+
+from functools import wraps
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+
+from ..models import Master, Review, Salon, Service
+from .cache import count_access, get_versions, stamp_key
+
+# Модели, от которых зависит раздел страницы
+PAGE_SECTIONS = {
+    "salons": (Salon,),
+    "services": (Service,),
+    "masters": (Master, Review),
+    "reviews": (Review,),
+}
+
+CACHE_NAMESPACES = ("page", "fragment")
+
+
+def bypass_cache(request):
+    """Сотрудники видят актуальные данные без кэша"""
+    user = getattr(request, "user", None)
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
+def sections_key(namespace, name, sections):
+    """Ключ кэша по имени и отметкам изменения моделей разделов"""
+    models = {model for section in sections for model in PAGE_SECTIONS[section]}
+    stamps = get_versions(sorted(stamp_key(model) for model in models))
+    digest = sha256("\n".join(map(str, [name, *stamps])).encode()).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+def get_fragment(request, name, sections, render):
+    """HTML раздела из кэша или результат render()"""
+    if bypass_cache(request):
+        return render()
+
+    key = sections_key("fragment", name, sections)
+    content = cache.get(key)
+    count_access("fragment", content is not None)
+    if content is None:
+        content = render()
+        cache.set(key, content, settings.PAGE_CACHE_TIMEOUT)
+    return content
+
+
+def cache_page_for_anonymous(*sections):
+    """Отдавать страницу анонимным посетителям из кэша.
+
+    В ключ входит текущая дата: шаблоны выводят ее через {% now %}.
+    Ответы с cookie и с кодом, отличным от 200, не сохраняются.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+
+            name = f"{request.get_full_path()}\n{timezone.localdate()}"
+            key = sections_key("page", name, sections)
+            cached = cache.get(key)
+            count_access("page", cached is not None)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.cookies:
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    settings.PAGE_CACHE_TIMEOUT,
+                )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,46 @@
+"""Рейтинг мастера и число его отзывов в полях Master"""
+
+from django.db.models import (
+    Avg,
+    Case,
+    Count,
+    F,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
+from django.db.models.functions import Coalesce
+
+from ..models import Master, Review
+
+
+def apply_review_change(master_id, count_delta, rating_delta):
+    """Изменить число отзывов и сумму оценок мастера на приращения"""
+    count = F("review_count") + count_delta
+    Master.objects.filter(pk=master_id).update(
+        review_count=count,
+        avg_rating=Case(
+            When(
+                review_count__gt=-count_delta,
+                then=(F("avg_rating") * F("review_count") + Value(float(rating_delta)))
+                / count,
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+    )
+
+
+def recompute_master_ratings():
+    """Пересчитать рейтинг и число отзывов всех мастеров"""
+    reviews = Review.objects.filter(master=OuterRef("pk")).values("master")
+    return Master.objects.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(count=Count("id")).values("count")), Value(0)
+        ),
+        avg_rating=Coalesce(
+            Subquery(reviews.annotate(avg=Avg("rating")).values("avg")), Value(0.0)
+        ),
+    )
@@ -0,0 +1,85 @@
+"""Статистика клиентов для панели администратора"""
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from ..models import Appointment, Client
+from .cache import get_or_build
+
+# Период статистики: сколько дней назад он начинается
+PERIODS = {"today": 0, "week": 7, "month": 30, "year": 365}
+
+DAILY_STATS_DAYS = 30
+ACTIVE_CLIENT_DAYS = 30
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build_client_statistics(period=None, today=None):
+    """Показатели клиентов за период одним запросом"""
+    today = today or timezone.localdate()
+    registered = "registration_date__gte"
+
+    period_filter = Q()
+    if period in PERIODS:
+        period_filter = Q(**{registered: _start_of(today - timedelta(PERIODS[period]))})
+
+    days = [today - timedelta(offset) for offset in range(DAILY_STATS_DAYS, -1, -1)]
+    daily = {
+        f"day_{index}": Count(
+            "id",
+            filter=period_filter
+            & Q(
+                registration_date__gte=_start_of(day),
+                registration_date__lt=_start_of(day + timedelta(1)),
+            ),
+        )
+        for index, day in enumerate(days)
+    }
+    has_recent_appointments = Exists(
+        Appointment.objects.filter(
+            client=OuterRef("pk"),
+            appointment_date__gte=today - timedelta(ACTIVE_CLIENT_DAYS),
+        )
+    )
+
+    row = Client.objects.aggregate(
+        total_count=Count("id", filter=period_filter),
+        today_registrations=Count("id", filter=Q(**{registered: _start_of(today)})),
+        weekly_registrations=Count(
+            "id", filter=Q(**{registered: _start_of(today - timedelta(7))})
+        ),
+        active_clients=Count("id", filter=has_recent_appointments),
+        **daily,
+    )
+
+    return {
+        "total_count": row["total_count"],
+        "today_registrations": row["today_registrations"],
+        "weekly_registrations": row["weekly_registrations"],
+        "active_clients": row["active_clients"],
+        "daily_stats": [
+            {"day": day.isoformat(), "count": row[f"day_{index}"]}
+            for index, day in enumerate(days)
+            if row[f"day_{index}"]
+        ],
+        "last_updated": timezone.now().isoformat(),
+    }
+
+
+def get_client_statistics(period=None):
+    """Статистика клиентов из кэша с коротким временем жизни"""
+    period = period if period in PERIODS else None
+    today = timezone.localdate()
+    return get_or_build(
+        "client_statistics",
+        (period or "all", today),
+        [],
+        lambda: build_client_statistics(period, today),
+        timeout=settings.CLIENT_STATISTICS_CACHE_TIMEOUT,
+    )
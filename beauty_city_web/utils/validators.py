@@ -10,8 +10,21 @@ def validate_future_date(date_value):
     return date_value
 
 
-def validate_working_hours(time_value):
-    """Валидация времени: 10:00-19:00 с шагом 30 минут"""
+def validate_working_hours(time_value, salon_id=None, date_value=None, duration=None):
+    """Валидация времени: часы работы салона с шагом 30 минут.
+
+    Без салона и даты проверяются часы работы по умолчанию. Если задана
+    длительность услуги, она должна закончиться до закрытия.
+    """
+    from .availability import (
+        SLOT_MINUTES,
+        WORKING_MASK,
+        fit_mask,
+        is_working_slot,
+        slot_index,
+        working_mask,
+    )
+
     if time_value:
         if isinstance(time_value, str):
             try:
@@ -20,16 +33,21 @@ def validate_working_hours(time_value):
             except (ValueError, TypeError):
                 raise ValidationError("Неверный формат времени")
 
-        hour = time_value.hour
-        minute = time_value.minute
-
-        if hour < 10 or hour > 19:
-            raise ValidationError("Время должно быть с 10:00 до 19:00")
-
-        if minute not in [0, 30]:
+        if time_value.minute not in [0, 30]:
             raise ValidationError(
                 "Время должно быть с шагом 30 минут (например: 10:00, 10:30, 11:00)"
             )
+
+        duration = duration or SLOT_MINUTES
+        if salon_id and date_value:
+            if not working_mask(salon_id, date_value) >> slot_index(time_value) & 1:
+                raise ValidationError("Салон не принимает записи на это время")
+            if not is_working_slot(salon_id, date_value, time_value, duration):
+                raise ValidationError("Услуга должна закончиться до закрытия салона")
+        elif not WORKING_MASK >> slot_index(time_value) & 1:
+            raise ValidationError("Время должно быть с 10:00 до 19:30")
+        elif not fit_mask(WORKING_MASK, duration) >> slot_index(time_value) & 1:
+            raise ValidationError("Услуга должна закончиться до 20:00")
     return time_value
 
 
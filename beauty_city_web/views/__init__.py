@@ -9,13 +9,17 @@ __all__ = [
     "admin_page",
     "is_admin",
     # API представления
+    "api_catalog",
     "api_salons",
     "api_services",
     "api_masters",
     "api_available_dates",
     "api_available_dates_simple",
     "api_available_times",
+    "api_availability_grid",
+    "api_first_available",
     "api_save_appointment",
+    "api_compatibility",
     "api_check_promo",
     "api_create_appointment",
     "api_get_appointment_details",
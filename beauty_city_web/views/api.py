@@ -1,13 +1,15 @@
 from phonenumbers import PhoneNumberFormat, format_number, parse, is_valid_number
 from phonenumbers.phonenumberutil import NumberParseException
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import json
-from django.db.models import Q
+from itertools import islice
+from django.db.models import Prefetch, Q
 from datetime import datetime, date, time as dt_time
-from django.utils import timezone
 from datetime import datetime, timedelta
-from ..models import Appointment, Salon, Master, Service, Client, PromoCode
+from ..models import Salon, Master, Service, Client, PromoCode
 from django.core.exceptions import ValidationError
 from ..forms.client import ClientForm
 from ..utils.validators import (
@@ -15,240 +17,258 @@ from ..utils.validators import (
     validate_working_hours,
     validate_appointment_datetime,
 )
+from ..utils.availability import (
+    DEFAULT_HORIZON_DAYS,
+    MAX_HORIZON_DAYS,
+    SLOT_MINUTES,
+    availability_versions,
+    get_availability_grid,
+    get_busy_by_date,
+    get_busy_mask,
+    get_master_calendar,
+    iter_free_slots,
+    free_slots,
+    group_by_period,
+    iter_slots,
+    slot_time,
+    working_mask,
+)
+from ..utils.booking import (
+    SlotUnavailableError,
+    book_appointment,
+    hold_slot,
+    save_client,
+    validate_booking,
+)
+from ..utils.cache import get_or_build
+from ..utils.conditional import availability_get, catalog_get
+from ..utils.catalog import (
+    filter_masters,
+    get_catalog,
+    get_catalog_index,
+    get_service_tree,
+)
+from ..utils.idempotency import idempotent
+from ..utils.images import photo_srcset
+from ..utils.statistics import get_client_statistics
+
+
+def _filter_param(request, name):
+    """Значение фильтра из GET-параметров, "any" означает отсутствие фильтра"""
+    value = request.GET.get(name)
+    if not value or value == "any":
+        return None
+    return value
+
+
+def _horizon_days(request, default=DEFAULT_HORIZON_DAYS):
+    """Горизонт записи в днях из GET-параметра days"""
+    try:
+        days = int(request.GET.get("days", default))
+    except ValueError:
+        return None
+    return max(1, min(days, MAX_HORIZON_DAYS))
+
+
+def _date_payload(date_obj, today):
+    """Описание даты для календаря записи"""
+    return {
+        "date": date_obj.strftime("%Y-%m-%d"),
+        "day": date_obj.day,
+        "month": date_obj.strftime("%B"),
+        "weekday": date_obj.strftime("%A"),
+        "is_today": date_obj == today,
+        "is_tomorrow": date_obj == today + timedelta(days=1),
+    }
 
 
 @csrf_exempt
+@catalog_get
+def api_catalog(request):
+    """Снимок каталога, повторные запросы получают 304"""
+    return HttpResponse(get_catalog()["body"], content_type="application/json")
+
+
+@csrf_exempt
+@catalog_get
 def api_salons(request):
     """Получить список всех активных салонов с фильтрацией по мастеру"""
     try:
-        master_id = request.GET.get("master_id")
+        master_id = _filter_param(request, "master_id")
+        salons = get_catalog()["data"]["salons"]
+        index = get_catalog_index()
 
-        if master_id and master_id != "any":
+        if master_id and int(master_id) in index.masters:
             # Фильтруем салоны по мастеру
-            try:
-                master = Master.objects.get(id=master_id)
-                salons = master.salons.filter(is_active=True).distinct()
-            except Master.DoesNotExist:
-                salons = Salon.objects.filter(is_active=True)
-        else:
-            # Получаем все активные салоны
-            salons = Salon.objects.filter(is_active=True)
+            salon_ids = index.master_salons[int(master_id)]
+            salons = [salon for salon in salons if salon["id"] in salon_ids]
 
-        data = []
-        for salon in salons:
-            data.append(
-                {
-                    "id": salon.id,
-                    "name": salon.name,
-                    "address": salon.address,
-                    "phone": str(salon.phone) if salon.phone else "",
-                    "working_hours": salon.working_hours,
-                    "photo_url": salon.photo.url if salon.photo else None,
-                }
-            )
-        print(f"API Salons: Found {len(data)} salons (master_id={master_id})")
-        return JsonResponse({"salons": data})
+        print(f"API Salons: Found {len(salons)} salons (master_id={master_id})")
+        return JsonResponse({"salons": salons})
     except Exception as e:
         print(f"API Salons Error: {str(e)}")
         return JsonResponse({"error": str(e), "salons": []}, status=500)
 
 
 @csrf_exempt
+@catalog_get
 def api_services(request):
-    """Получить услуги с фильтрацией по салону и мастеру"""
-    salon_id = request.GET.get("salon_id")
-    master_id = request.GET.get("master_id")
-
-    services = Service.objects.filter(is_active=True)
-
-    if salon_id and salon_id != "any":
-        services = services.filter(masters__salons__id=salon_id).distinct()
-
-    if master_id and master_id != "any":
-        services = services.filter(masters__id=master_id).distinct()
-
-    categories = {}
-    for service in services:
-        category_name = service.category.name
-        if category_name not in categories:
-            categories[category_name] = {
-                "id": service.category.id,
-                "name": category_name,
-                "services": [],
-            }
-        categories[category_name]["services"].append(
-            {
-                "id": service.id,
-                "name": service.name,
-                "price": float(service.price),
-                "duration": service.duration,
-                "photo_url": service.photo.url if service.photo else None,
-            }
-        )
-
-    return JsonResponse({"categories": list(categories.values())})
+    """Получить услуги по категориям с фильтрацией по салону и мастеру"""
+    tree = get_service_tree(
+        salon_id=_filter_param(request, "salon_id"),
+        master_id=_filter_param(request, "master_id"),
+    )
+    return JsonResponse({"categories": tree})
 
 
 @csrf_exempt
+@catalog_get
 def api_masters(request):
-    """Получить мастеров с фильтрацией по салону и услуге"""
-    salon_id = request.GET.get("salon_id")
-    service_id = request.GET.get("service_id")
-
-    masters = Master.objects.filter(is_active=True)
+    """Получить мастеров с фильтрацией по салону и услуге.
+
+    Мастера фильтруются в памяти по снимку каталога. С sort=rating
+    сначала идут мастера с высшим рейтингом. С параметром page
+    ответ разбивается на страницы по page_size мастеров.
+    """
+    catalog = get_catalog()["data"]
+    masters = filter_masters(
+        salon_id=_filter_param(request, "salon_id"),
+        service_id=_filter_param(request, "service_id"),
+    )
+    if request.GET.get("sort") == "rating":
+        masters = sorted(
+            masters, key=lambda master: (-master["rating"], -master["review_count"])
+        )
 
-    if salon_id and salon_id != "any":
-        masters = masters.filter(salons__id=salon_id).distinct()
+    pagination = None
+    if request.GET.get("page"):
+        try:
+            page_size = max(1, min(int(request.GET.get("page_size", 20)), 100))
+        except ValueError:
+            return JsonResponse({"error": "Invalid page_size"}, status=400)
+        page = Paginator(masters, page_size).get_page(request.GET.get("page"))
+        masters = page.object_list
+        pagination = {
+            "page": page.number,
+            "page_size": page_size,
+            "pages": page.paginator.num_pages,
+            "total": page.paginator.count,
+        }
 
-    if service_id and service_id != "any":
-        masters = masters.filter(services__id=service_id).distinct()
+    salons = {salon["id"]: salon for salon in catalog["salons"]}
+    services = {service["id"]: service for service in catalog["services"]}
 
     data = []
     for master in masters:
-        master_salons = master.salons.filter(is_active=True)
         salons_data = [
-            {"id": salon.id, "name": salon.name, "address": salon.address}
-            for salon in master_salons
+            {
+                "id": salon_id,
+                "name": salons[salon_id]["name"],
+                "address": salons[salon_id]["address"],
+            }
+            for salon_id in master["salon_ids"]
         ]
 
-        master_services = master.services.filter(is_active=True)
         services_data = [
-            {"id": service.id, "name": service.name, "price": float(service.price)}
-            for service in master_services
+            {
+                "id": service_id,
+                "name": services[service_id]["name"],
+                "price": services[service_id]["price"],
+            }
+            for service_id in master["service_ids"]
         ]
 
         data.append(
             {
-                "id": master.id,
-                "name": master.name,
-                "specialty": master.specialty,
-                "experience": master.experience,
-                "rating": float(master.rating) if master.rating else 0.0,
-                "photo_url": master.photo.url if master.photo else None,
+                "id": master["id"],
+                "name": master["name"],
+                "specialty": master["specialty"],
+                "experience": master["experience"],
+                "rating": master["rating"],
+                "review_count": master["review_count"],
+                "photo_url": master["photo_url"],
+                "photo_srcset": master["photo_srcset"],
                 "salons": salons_data,
                 "services": services_data,
             }
         )
 
-    return JsonResponse({"masters": data})
+    response = {"masters": data}
+    if pagination:
+        response["pagination"] = pagination
+    return JsonResponse(response)
 
 
 @csrf_exempt
+@availability_get
 def api_available_dates(request):
     """Получить доступные даты для записи"""
-    master_id = request.GET.get("master_id")
-    salon_id = request.GET.get("salon_id")
-
-    today = datetime.now().date()
-    dates = []
+    master_id = _filter_param(request, "master_id")
+    salon_id = _filter_param(request, "salon_id")
 
-    for i in range(30):
-        date = today + timedelta(days=i)
+    days = _horizon_days(request)
+    if days is None:
+        return JsonResponse({"error": "Invalid days"}, status=400)
 
-        if master_id:
-            try:
-                master = Master.objects.get(id=master_id)
-                available_services = master.get_available_services()
-                if available_services:
-                    service = available_services[0]
-                    available_times = service.get_available_times(
-                        date, master_id=master_id, salon_id=salon_id
-                    )
-                else:
-                    available_times = []
-            except Master.DoesNotExist:
-                available_times = []
-        else:
-            available_times = []
+    today = datetime.now().date()
 
-        if not master_id or available_times:
-            dates.append(
-                {
-                    "date": date.strftime("%Y-%m-%d"),
-                    "day": date.day,
-                    "month": date.strftime("%B"),
-                    "weekday": date.strftime("%A"),
-                    "is_today": date == today,
-                    "is_tomorrow": date == today + timedelta(days=1),
-                }
-            )
+    if not master_id:
+        dates = [
+            today + timedelta(days=i)
+            for i in range(days)
+            if working_mask(salon_id, today + timedelta(days=i))
+        ]
+    else:
+        try:
+            master = Master.objects.get(id=master_id)
+            dates = get_master_calendar(master, today, days, salon_id=salon_id)
+        except (Master.DoesNotExist, ValueError):
+            dates = []
 
-    return JsonResponse({"dates": dates})
+    return JsonResponse({"dates": [_date_payload(d, today) for d in dates]})
 
 
 @csrf_exempt
+@availability_get
 def api_available_dates_simple(request):
     """Получить доступные даты без привязки к мастеру"""
-    salon_id = request.GET.get("salon_id")
-    service_id = request.GET.get("service_id")
-    master_id = request.GET.get("master_id")
+    salon_id = _filter_param(request, "salon_id")
+    service_id = _filter_param(request, "service_id")
+    master_id = _filter_param(request, "master_id")
 
-    today = datetime.now().date()
-    dates = []
+    days = _horizon_days(request)
+    if days is None:
+        return JsonResponse({"error": "Invalid days"}, status=400)
 
-    if not any([salon_id, service_id, master_id]):
-        for i in range(30):
-            date_obj = today + timedelta(days=i)
-            dates.append(
-                {
-                    "date": date_obj.strftime("%Y-%m-%d"),
-                    "day": date_obj.day,
-                    "month": date_obj.strftime("%B"),
-                    "weekday": date_obj.strftime("%A"),
-                    "is_today": date_obj == today,
-                    "is_tomorrow": date_obj == today + timedelta(days=1),
-                }
-            )
-        return JsonResponse({"dates": dates})
-
-    for i in range(30):
-        date_obj = today + timedelta(days=i)
-        date_str = date_obj.strftime("%Y-%m-%d")
+    today = datetime.now().date()
 
-        appointments = Appointment.objects.filter(
-            appointment_date=date_obj, status__in=["pending", "confirmed"]
+    busy_masks = {}
+    if any([salon_id, service_id, master_id]):
+        busy_masks = get_busy_by_date(
+            today,
+            days,
+            master_id=master_id,
+            salon_id=salon_id,
+            service_id=service_id,
         )
 
-        if salon_id and salon_id != "any":
-            appointments = appointments.filter(salon_id=salon_id)
-
-        if service_id and service_id != "any":
-            appointments = appointments.filter(service_id=service_id)
-
-        if master_id and master_id != "any":
-            appointments = appointments.filter(master_id=master_id)
-
-        busy_times = set(appointments.values_list("appointment_time", flat=True))
-
-        all_times = []
-        for hour in range(10, 20):
-            for minute in (0, 30):
-                if hour == 19 and minute == 30:
-                    break
-                all_times.append(f"{hour:02d}:{minute:02d}")
-
-        if len(busy_times) < len(all_times):
-            dates.append(
-                {
-                    "date": date_str,
-                    "day": date_obj.day,
-                    "month": date_obj.strftime("%B"),
-                    "weekday": date_obj.strftime("%A"),
-                    "is_today": date_obj == today,
-                    "is_tomorrow": date_obj == today + timedelta(days=1),
-                }
-            )
+    dates = []
+    for i in range(days):
+        date_obj = today + timedelta(days=i)
+        if working_mask(salon_id, date_obj) & ~busy_masks.get(date_obj, 0):
+            dates.append(_date_payload(date_obj, today))
 
     return JsonResponse({"dates": dates})
 
 
 @csrf_exempt
+@availability_get
 def api_available_times(request):
     """Получить доступное время на выбранную дату"""
     date_str = request.GET.get("date")
-    master_id = request.GET.get("master_id")
-    service_id = request.GET.get("service_id")
-    salon_id = request.GET.get("salon_id")
+    master_id = _filter_param(request, "master_id")
+    service_id = _filter_param(request, "service_id")
+    salon_id = _filter_param(request, "salon_id")
 
     if not date_str:
         return JsonResponse({"error": "Date is required"}, status=400)
@@ -262,59 +282,173 @@ def api_available_times(request):
     if date < today:
         return JsonResponse({"times": []})
 
-    times = []
-
-    morning_times = []
-    day_times = []
-    evening_times = []
-
-    # Рабочие часы: с 10:00 до 19:00, шаг 30 минут
-    for hour in range(10, 20):
-        for minute in (0, 30):
-            if hour == 19 and minute == 30:
-                break
-            time_str = f"{hour:02d}:{minute:02d}"
-
-            # Проверяем, свободно ли это время
-            if master_id and master_id != "any":
-                # Проверяем занятость у мастера
-                appointments = Appointment.objects.filter(
-                    master_id=master_id,
-                    appointment_date=date,
-                    appointment_time=time_str,
-                    status__in=["pending", "confirmed"],
-                )
-                if appointments.exists():
-                    continue
-
-            if service_id and service_id != "any" and salon_id and salon_id != "any":
-                appointments = Appointment.objects.filter(
-                    service_id=service_id,
-                    salon_id=salon_id,
-                    appointment_date=date,
-                    appointment_time=time_str,
-                    status__in=["pending", "confirmed"],
-                )
-                if appointments.exists():
-                    continue
-
-            if hour < 12:
-                morning_times.append(time_str)
-            elif hour < 17:
-                day_times.append(time_str)
-            else:
-                evening_times.append(time_str)
-
-    if morning_times:
-        times.append({"period": "Утро", "times": morning_times})
-    if day_times:
-        times.append({"period": "День", "times": day_times})
-    if evening_times:
-        times.append({"period": "Вечер", "times": evening_times})
+    def build_times():
+        busy_mask = get_busy_mask(
+            date, master_id=master_id, salon_id=salon_id, service_id=service_id
+        )
+        return group_by_period(free_slots(busy_mask, working_mask(salon_id, date)))
 
+    versions = availability_versions(
+        date, master_id=master_id, salon_id=salon_id, service_id=service_id
+    )
+    if not versions:
+        return JsonResponse({"times": build_times()})
+
+    times = get_or_build(
+        "available_times",
+        (salon_id, master_id, service_id, date),
+        versions,
+        build_times,
+        timeout=settings.AVAILABILITY_CACHE_TIMEOUT,
+    )
     return JsonResponse({"times": times})
 
 
+@csrf_exempt
+@availability_get
+def api_availability_grid(request):
+    """Получить сетку свободного времени мастеров салона на несколько дней.
+
+    Свободные слоты дня кодируются шестнадцатеричной маской: бит i
+    соответствует i-му времени из списка slots.
+    """
+    salon_id = _filter_param(request, "salon_id")
+    service_id = _filter_param(request, "service_id")
+
+    days = _horizon_days(request, default=7)
+    if days is None:
+        return JsonResponse({"error": "Invalid days"}, status=400)
+
+    today = datetime.now().date()
+    date_str = request.GET.get("date_from")
+    if date_str:
+        try:
+            start = max(datetime.strptime(date_str, "%Y-%m-%d").date(), today)
+        except ValueError:
+            return JsonResponse({"error": "Invalid date format"}, status=400)
+    else:
+        start = today
+
+    duration = SLOT_MINUTES
+    if service_id:
+        try:
+            service = Service.objects.get(id=service_id, is_active=True)
+        except (Service.DoesNotExist, ValueError):
+            return JsonResponse({"error": "Service not found"}, status=404)
+        duration = service.duration
+        masters = service.get_available_masters(salon_id=salon_id)
+    else:
+        masters = Master.objects.filter(is_active=True)
+        if salon_id:
+            masters = masters.filter(salons__id=salon_id)
+
+    masters = list(masters.distinct().order_by("order", "id").values("id", "name"))
+    grid = get_availability_grid(
+        [master["id"] for master in masters], start, days, duration, salon_id=salon_id
+    )
+
+    # Слоты сетки: от первого до последнего рабочего слота диапазона
+    working = 0
+    for i in range(days):
+        working |= working_mask(salon_id, start + timedelta(days=i))
+    working_slots = list(iter_slots(working))
+    first_slot = working_slots[0] if working_slots else 0
+    last_slot = working_slots[-1] if working_slots else -1
+
+    return JsonResponse(
+        {
+            "date_from": start.isoformat(),
+            "days": days,
+            "slots": [
+                slot_time(index).strftime("%H:%M")
+                for index in range(first_slot, last_slot + 1)
+            ],
+            "masters": [
+                {
+                    "id": master["id"],
+                    "name": master["name"],
+                    "free": [
+                        format(mask >> first_slot, "x") for mask in grid[master["id"]]
+                    ],
+                }
+                for master in masters
+            ],
+        }
+    )
+
+
+@csrf_exempt
+@availability_get
+def api_first_available(request):
+    """Получить ближайшее свободное время на услугу у любого мастера"""
+    service_id = _filter_param(request, "service_id")
+    salon_id = _filter_param(request, "salon_id")
+
+    if not service_id:
+        return JsonResponse({"error": "service_id is required"}, status=400)
+
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 5)), 50))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+
+    days = _horizon_days(request)
+    if days is None:
+        return JsonResponse({"error": "Invalid days"}, status=400)
+
+    try:
+        service = Service.objects.get(id=service_id, is_active=True)
+    except (Service.DoesNotExist, ValueError):
+        return JsonResponse({"error": "Service not found"}, status=404)
+
+    masters = (
+        service.get_available_masters(salon_id=salon_id)
+        .distinct()
+        .order_by("order", "id")
+        .prefetch_related(
+            Prefetch(
+                "salons",
+                queryset=Salon.objects.filter(is_active=True).order_by("id"),
+                to_attr="active_salons",
+            )
+        )
+    )
+
+    # Салон, в котором будет запись к каждому мастеру
+    master_salons = {}
+    for master in masters:
+        salons = [
+            salon
+            for salon in master.active_salons
+            if not salon_id or str(salon.id) == str(salon_id)
+        ]
+        if salons:
+            master_salons[master.id] = (master, salons[0])
+
+    slots = []
+    free = iter_free_slots(
+        list(master_salons),
+        datetime.now().date(),
+        days,
+        service.duration,
+        salons={
+            master_id: salon.id for master_id, (_, salon) in master_salons.items()
+        },
+    )
+    for slot_date, slot_start, master_id in islice(free, limit):
+        master, salon = master_salons[master_id]
+        slots.append(
+            {
+                "date": slot_date.strftime("%Y-%m-%d"),
+                "time": slot_start.strftime("%H:%M"),
+                "master": {"id": master.id, "name": master.name},
+                "salon": {"id": salon.id, "name": salon.name, "address": salon.address},
+            }
+        )
+
+    return JsonResponse({"slots": slots})
+
+
 @csrf_exempt
 def api_save_appointment(request):
     """Сохранить данные записи в сессии"""
@@ -330,6 +464,54 @@ def api_save_appointment(request):
                 "time": data.get("time"),
             }
 
+            # Удерживаем выбранное время, пока клиент оформляет запись
+            hold = None
+            if all(appointment_data.values()):
+                if not request.session.session_key:
+                    request.session.save()
+                try:
+                    booking = {
+                        "master": Master.objects.get(id=appointment_data["master_id"]),
+                        "salon": Salon.objects.get(id=appointment_data["salon_id"]),
+                        "service": Service.objects.get(
+                            id=appointment_data["service_id"]
+                        ),
+                        "appointment_date": datetime.strptime(
+                            appointment_data["date"], "%Y-%m-%d"
+                        ).date(),
+                        "appointment_time": datetime.strptime(
+                            appointment_data["time"], "%H:%M"
+                        ).time(),
+                    }
+                except (
+                    Master.DoesNotExist,
+                    Salon.DoesNotExist,
+                    Service.DoesNotExist,
+                    ValueError,
+                ):
+                    return JsonResponse(
+                        {"success": False, "error": "Некорректные данные записи"},
+                        status=400,
+                    )
+
+                try:
+                    validate_booking(**booking)
+                    hold = hold_slot(request.session.session_key, **booking)
+                except ValidationError as error:
+                    return JsonResponse(
+                        {"success": False, "error": error.messages[0]},
+                        status=400,
+                    )
+                except SlotUnavailableError as error:
+                    return JsonResponse(
+                        {
+                            "success": False,
+                            "error": str(error),
+                            "error_code": "slot_unavailable",
+                        },
+                        status=409,
+                    )
+
             # Сохраняем в сессии
             request.session["appointment_data"] = appointment_data
             request.session.modified = True
@@ -339,6 +521,7 @@ def api_save_appointment(request):
                     "success": True,
                     "redirect_url": "/service-finally/",
                     "message": "Данные сохранены",
+                    "hold_expires_at": hold.expires_at.isoformat() if hold else None,
                 }
             )
         except json.JSONDecodeError:
@@ -348,6 +531,7 @@ def api_save_appointment(request):
 
 
 @csrf_exempt
+@catalog_get
 def api_check_master_salon_compatibility(request):
     """Проверить, работает ли мастер в указанном салоне"""
     master_id = request.GET.get("master_id")
@@ -356,21 +540,27 @@ def api_check_master_salon_compatibility(request):
     if not master_id or not salon_id:
         return JsonResponse({"error": "Требуются master_id и salon_id"}, status=400)
 
+    index = get_catalog_index()
     try:
-        master = Master.objects.get(id=master_id)
-        salon = Salon.objects.get(id=salon_id)
+        master = index.masters[int(master_id)]
+        salon = index.salons[int(salon_id)]
+    except (KeyError, ValueError):
+        return JsonResponse({"compatible": False, "error": "Объект не найден"})
+
+    return JsonResponse(
+        {
+            "compatible": index.compatible(master["id"], salon["id"]),
+            "master_name": master["name"],
+            "salon_name": salon["name"],
+        }
+    )
 
-        is_compatible = master.salons.filter(id=salon.id).exists()
 
-        return JsonResponse(
-            {
-                "compatible": is_compatible,
-                "master_name": master.name,
-                "salon_name": salon.name,
-            }
-        )
-    except (Master.DoesNotExist, Salon.DoesNotExist):
-        return JsonResponse({"compatible": False, "error": "Объект не найден"})
+@csrf_exempt
+@catalog_get
+def api_compatibility(request):
+    """Все связи мастеров, салонов и услуг одним ответом"""
+    return JsonResponse(get_catalog_index().matrix())
 
 
 @csrf_exempt
@@ -402,6 +592,7 @@ def api_check_promo(request):
 
 
 @csrf_exempt
+@idempotent
 def api_create_appointment(request):
     """Создать запись"""
     if request.method == "POST":
@@ -438,51 +629,48 @@ def api_create_appointment(request):
             if not form.is_valid():
                 return JsonResponse({"error": form.errors.as_text()}, status=400)
 
-            client, created = Client.objects.update_or_create(
-                phone=phone,
-                defaults={"name": name, "email": final_data.get("email", "")},
-            )
-
+            salon_id = final_data.get("salon_id")
+            service_id = final_data.get("service_id")
+            master_id = final_data.get("master_id")
             salon = None
             service = None
             master = None
 
-            if final_data.get("salon_id"):
-                try:
-                    salon = Salon.objects.get(id=final_data.get("salon_id"))
-                except Salon.DoesNotExist:
-                    pass
-
-            if final_data.get("service_id"):
-                try:
-                    service = Service.objects.get(id=final_data.get("service_id"))
-                except Service.DoesNotExist:
-                    pass
-
-            if final_data.get("master_id"):
-                try:
-                    master = Master.objects.get(id=final_data.get("master_id"))
-                except Master.DoesNotExist:
-                    pass
+            # Мастер и салон читаются одним запросом через их связь,
+            # он же проверяет, что мастер работает в салоне
+            if master_id and salon_id:
+                link = (
+                    Master.salons.through.objects.select_related("master", "salon")
+                    .filter(master_id=master_id, salon_id=salon_id)
+                    .first()
+                )
+                if link:
+                    master, salon = link.master, link.salon
+                else:
+                    master = Master.objects.filter(id=master_id).first()
+                    salon = Salon.objects.filter(id=salon_id).first()
+                    if master and salon:
+                        return JsonResponse(
+                            {
+                                "success": False,
+                                "message": f"Мастер {master.name} не работает в салоне {salon.name}. Пожалуйста, выберите другой салон.",
+                                "error_code": "master_salon_incompatible",
+                            },
+                            status=400,
+                        )
+            elif master_id:
+                master = Master.objects.filter(id=master_id).first()
+            elif salon_id:
+                salon = Salon.objects.filter(id=salon_id).first()
 
-            if master and salon:
-                if not master.salons.filter(id=salon.id).exists():
-                    return JsonResponse(
-                        {
-                            "success": False,
-                            "message": f"Мастер {master.name} не работает в салоне {salon.name}. Пожалуйста, выберите другой салон.",
-                            "error_code": "master_salon_incompatible",
-                        },
-                        status=400,
-                    )
+            if service_id:
+                service = Service.objects.filter(id=service_id).first()
 
             if not salon:
                 # Если салон не выбран, выбираем первый салон, где работает мастер
                 if master:
-                    master_salons = master.salons.filter(is_active=True)
-                    if master_salons.exists():
-                        salon = master_salons.first()
-                    else:
+                    salon = master.salons.filter(is_active=True).first()
+                    if not salon:
                         return JsonResponse(
                             {
                                 "success": False,
@@ -496,60 +684,75 @@ def api_create_appointment(request):
                 service = Service.objects.filter(is_active=True).first()
 
             if not master and service:
-                masters = service.masters.filter(is_active=True)
-                if masters.exists():
-                    master = masters.first()
+                master = service.masters.filter(is_active=True).first()
+
+            appointment_date = datetime.strptime(final_data["date"], "%Y-%m-%d").date()
+            appointment_time = datetime.strptime(final_data["time"], "%H:%M").time()
+
+            if not master or not service:
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "message": "Не удалось подобрать мастера и услугу для записи.",
+                    },
+                    status=400,
+                )
 
             try:
-                if Appointment.objects.get(
+                validate_booking(
                     master=master,
-                    appointment_date=datetime.strptime(
-                        final_data["date"], "%Y-%m-%d"
-                    ).date(),
-                    appointment_time=datetime.strptime(final_data["time"], "%H:%M").time(),
-                ):
+                    service=service,
+                    salon=salon,
+                    appointment_date=appointment_date,
+                    appointment_time=appointment_time,
+                )
+            except ValidationError as error:
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "message": error.messages[0],
+                        "error": error.messages[0],
+                    },
+                    status=400,
+                )
+
+            promo = None
+            if promocode:
+                promo = PromoCode.objects.filter(
+                    code=promocode.upper(), is_active=True
+                ).first()
+                if not promo or not promo.is_valid():
                     return JsonResponse(
                         {
                             "success": False,
-                            "message": "Запись на это время недоступна для этого мастера.",
+                            "message": "Данный промокод недействителен",
                         }
                     )
-            except Appointment.DoesNotExist:
-                pass
-
-            promo = None
-            if promocode:
-                try:
-                    promo = PromoCode.objects.get(code=promocode.upper(), is_active=True)
-                    if not promo.is_valid():
-                        return JsonResponse(
-                            {
-                                "success": False,
-                                "message": "Данный промокод недействителен",
-                            }
-                        )
-                except PromoCode.DoesNotExist:
-                    return JsonResponse(
-                            {
-                                "success": False,
-                                "message": "Данный промокод недействителен",
-                            }
-                        )
 
-            appointment = Appointment.objects.create(
-                client=client,
-                master=master,
-                service=service,
-                salon=salon,
-                appointment_date=datetime.strptime(
-                    final_data["date"], "%Y-%m-%d"
-                ).date(),
-                appointment_time=datetime.strptime(final_data["time"], "%H:%M").time(),
-                status="pending",
-                promo_code=promo,
-                original_price=service.price if service else 0,
-                final_price=service.price if service else 0,
-            )
+            try:
+                # Клиент сохраняется только после проверки времени
+                appointment = book_appointment(
+                    client=lambda: save_client(
+                        phone, name, final_data.get("email", "")
+                    ),
+                    master=master,
+                    service=service,
+                    salon=salon,
+                    appointment_date=appointment_date,
+                    appointment_time=appointment_time,
+                    promo_code=promo,
+                    hold_key=request.session.session_key,
+                )
+            except SlotUnavailableError as error:
+                return JsonResponse(
+                    {
+                        "success": False,
+                        "message": str(error),
+                        "error": str(error),
+                        "error_code": "slot_unavailable",
+                    },
+                    status=409,
+                )
 
             if "appointment_data" in request.session:
                 del request.session["appointment_data"]
@@ -597,6 +800,7 @@ def api_get_appointment_details(request):
             "master": {
                 "name": master.name,
                 "photo_url": master.photo.url if master.photo else None,
+                "photo_srcset": photo_srcset(master),
             },
             "date": appointment_data.get("date"),
             "time": appointment_data.get("time"),
@@ -612,31 +816,16 @@ def api_client_statistics(request):
     """Получить статистику по клиентам"""
 
     period = request.GET.get("period", "all")
-
-    stats = Client.get_registration_stats(period if period != "all" else None)
-
-    today = timezone.now().date()
-
-    today_count = Client.objects.filter(registration_date__date=today).count()
-
-    week_ago = today - timedelta(days=7)
-    weekly_count = Client.objects.filter(registration_date__date__gte=week_ago).count()
-
-    month_ago = today - timedelta(days=30)
-    active_clients = (
-        Client.objects.filter(appointments__appointment_date__gte=month_ago)
-        .distinct()
-        .count()
-    )
+    stats = get_client_statistics(period)
 
     response_data = {
         "total_clients": stats["total_count"],
-        "today_registrations": today_count,
-        "weekly_registrations": weekly_count,
-        "active_clients": active_clients,
+        "today_registrations": stats["today_registrations"],
+        "weekly_registrations": stats["weekly_registrations"],
+        "active_clients": stats["active_clients"],
         "daily_stats": stats["daily_stats"],
         "period": period,
-        "last_updated": timezone.now().isoformat(),
+        "last_updated": stats["last_updated"],
     }
 
     return JsonResponse(response_data)
@@ -656,6 +845,7 @@ def api_total_clients(request):
 
 
 @csrf_exempt
+@idempotent
 def api_contact_request(request):
     """Создать заявку на консультацию с главной страницы"""
     if request.method == "POST":
@@ -2,34 +2,44 @@ from django.contrib.auth.decorators import user_passes_test
 from django.shortcuts import render, redirect
 from django.conf import settings
 from ..models import Salon, Service, Master, Review, PromoCode
+from ..utils.pagecache import cache_page_for_anonymous
 import json
 from datetime import datetime
 from decimal import Decimal
 
+# Сколько последних отзывов показывать в карусели главной страницы
+INDEX_REVIEWS_LIMIT = 12
 
+
+@cache_page_for_anonymous("salons", "services", "masters", "reviews")
 def index(request):
+    # Запросы выполняются при выводе разделов, которых нет в кэше
     salons = Salon.objects.filter(is_active=True)[:4]
-    services = Service.objects.all()
-    masters = Master.objects.filter(is_active=True)
-    reviews = Review.objects.all()
-
-    salons_for_map = []
-    for salon in salons:
-        salons_for_map.append(
-            {
-                "name": salon.name,
-                "address": salon.address,
-                "full_address": f"Москва, {salon.address}",
-                "phone": str(salon.phone) if salon.phone else "",
-                "working_hours": salon.working_hours,
-            }
-        )
+    services = Service.objects.filter(is_active=True).order_by("order", "id")
+    masters = Master.objects.filter(is_active=True).order_by("order", "id")
+    reviews = Review.objects.select_related("client").order_by("-date", "-id")[
+        :INDEX_REVIEWS_LIMIT
+    ]
+
+    def salons_json():
+        salons_for_map = []
+        for salon in salons:
+            salons_for_map.append(
+                {
+                    "name": salon.name,
+                    "address": salon.address,
+                    "full_address": f"Москва, {salon.address}",
+                    "phone": str(salon.phone) if salon.phone else "",
+                    "working_hours": salon.working_hours,
+                }
+            )
+        return json.dumps(salons_for_map, ensure_ascii=False)
 
     context = {
         "salons": salons,
-        "salons_json": json.dumps(salons_for_map, ensure_ascii=False),
+        "salons_json": salons_json,
         "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
-        "empty_salons_count": max(0, 4 - len(salons)),
+        "empty_salons_count": lambda: max(0, 4 - len(salons)),
         "services": services,
         "masters": masters,
         "reviews": reviews,
@@ -37,6 +47,7 @@ def index(request):
     return render(request, "index.html", context)
 
 
+@cache_page_for_anonymous("salons")
 def service(request):
     # Получаем все активные салоны
     salons = Salon.objects.filter(is_active=True)
@@ -57,10 +57,76 @@ WSGI_APPLICATION = "config.wsgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / env.str("DB_NAME", "db.sqlite3")
+        "NAME": BASE_DIR / env.str("DB_NAME", "db.sqlite3"),
+        # Транзакция сразу берет блокировку на запись, параллельные
+        # записи ждут своей очереди вместо ошибки посреди транзакции
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
+        # Тестовая база в файле: тестам параллельной записи нужна
+        # база, общая для всех потоков
+        "TEST": {"NAME": BASE_DIR / env.str("TEST_DB_NAME", "test_db.sqlite3")},
     }
 }
 
+CACHE_BACKEND = env.str(
+    "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+)
+
+# Ответы на запросы с Idempotency-Key. Повтор запроса может прийти
+# в другой процесс, поэтому в рабочем окружении нужен общий бэкенд
+# (Redis, Memcached, база данных). По умолчанию используется тот же
+# бэкенд, что и для основного кэша.
+IDEMPOTENCY_CACHE_BACKEND = env.str("IDEMPOTENCY_CACHE_BACKEND", CACHE_BACKEND)
+IDEMPOTENCY_CACHE = {
+    "BACKEND": IDEMPOTENCY_CACHE_BACKEND,
+    "LOCATION": env.str(
+        "IDEMPOTENCY_CACHE_LOCATION",
+        (
+            "beauty-city-idempotency"
+            if IDEMPOTENCY_CACHE_BACKEND.endswith("LocMemCache")
+            else env.str("CACHE_LOCATION", "")
+        ),
+    ),
+}
+# MAX_ENTRIES понимают только locmem, db и file бэкенды, остальные
+# передают OPTIONS клиенту. Для них объем ограничивает время жизни ключей.
+if IDEMPOTENCY_CACHE_BACKEND.rsplit(".", 1)[-1] in (
+    "LocMemCache",
+    "DatabaseCache",
+    "FileBasedCache",
+):
+    IDEMPOTENCY_CACHE["OPTIONS"] = {
+        "MAX_ENTRIES": env.int("IDEMPOTENCY_MAX_ENTRIES", 10000)
+    }
+
+# LocMemCache живет в памяти одного процесса: сброс версий кэша в одном
+# воркере не виден другим. При нескольких воркерах нужен общий кэш,
+# например django.core.cache.backends.redis.RedisCache
+CACHES = {
+    "default": {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": env.str("CACHE_LOCATION", "beauty-city"),
+    },
+    "idempotency": IDEMPOTENCY_CACHE,
+}
+
+# Время жизни закэшированного свободного времени, секунды
+AVAILABILITY_CACHE_TIMEOUT = env.int("AVAILABILITY_CACHE_TIMEOUT", 300)
+
+# Время жизни закэшированных публичных страниц и их разделов, секунды
+PAGE_CACHE_TIMEOUT = env.int("PAGE_CACHE_TIMEOUT", 3600)
+
+# Время жизни закэшированной статистики клиентов, секунды
+CLIENT_STATISTICS_CACHE_TIMEOUT = env.int("CLIENT_STATISTICS_CACHE_TIMEOUT", 60)
+
+# Готовить копии фото в фоновом потоке, False - сразу после сохранения
+IMAGE_VARIANTS_BACKGROUND = env.bool("IMAGE_VARIANTS_BACKGROUND", True)
+
+# Сколько минут выбранное время удерживается за клиентом до оформления
+SLOT_HOLD_MINUTES = env.int("SLOT_HOLD_MINUTES", 10)
+
+# Сколько секунд хранится ответ на запрос с Idempotency-Key
+IDEMPOTENCY_KEY_TIMEOUT = env.int("IDEMPOTENCY_KEY_TIMEOUT", 24 * 60 * 60)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -13,6 +13,7 @@ from beauty_city_web.models import (
     Client,
     PromoCode,
     Appointment,
+    Review,
 )
 from django.utils import timezone
 
@@ -67,25 +68,21 @@ def create_test_data():
             name="Елизавета Лапина",
             specialty="Мастер маникюра",
             experience="3 г. 10 мес.",
-            rating=4.8,
         ),
         Master(
             name="Анастасия Сергеева",
             specialty="Парикмахер",
             experience="4 г. 9 мес.",
-            rating=4.9,
         ),
         Master(
             name="Ева Колесова",
             specialty="Визажист",
             experience="1 г. 2 мес.",
-            rating=4.7,
         ),
         Master(
             name="Мария Суворова",
             specialty="Стилист",
             experience="1 г. 1 мес.",
-            rating=4.6,
         ),
     ]
     for master in masters:
@@ -119,6 +116,27 @@ def create_test_data():
         client.save()
     print(f"Создано клиентов: {len(clients)}")
 
+    # Рейтинг и число отзывов мастеров обновляют сигналы отзывов
+    reviews = [
+        (0, 0, "Очень аккуратный маникюр, держится уже третью неделю.", 5),
+        (1, 0, "Быстро и красиво, приду еще.", 4.5),
+        (2, 1, "Отличная стрижка, мастер учла все пожелания.", 5),
+        (3, 1, "Укладка продержалась весь вечер.", 5),
+        (4, 2, "Макияж на свадьбу получился идеальным.", 5),
+        (0, 2, "Хорошо, но пришлось немного подождать.", 4),
+        (1, 3, "Помогла подобрать образ, спасибо!", 5),
+        (2, 3, "Приятный мастер, но результат на любителя.", 4),
+    ]
+    for i, (client, master, text, rating) in enumerate(reviews):
+        Review.objects.create(
+            client=clients[client],
+            master=masters[master],
+            text=text,
+            date=timezone.now().date() - timedelta(days=i + 1),
+            rating=rating,
+        )
+    print(f"Создано отзывов: {len(reviews)}")
+
     now = timezone.now()
     promocodes = [
         PromoCode(